@@ -1,9 +1,71 @@
-import pygame
 import time
 import sys
 import heapq
+from bisect import bisect_left
+from array import array
 from collections import deque
 
+# Algorithm names
+ALGO_BFS = "BFS"
+ALGO_DIJKSTRA = "Dijkstra"
+ALGO_ASTAR = "A*"
+ALGO_DFS = "DFS"
+ALGO_IDA_STAR = "IDA*"
+ALGO_SMA_STAR = "SMA*"
+ALGO_ALT = "ALT"
+ALGO_REDUCED = "Reduced"
+
+# Search events yielded by the Pathfinder.iter_* generators as (event, value)
+EXPAND = 0  # value: cell index taken off the frontier
+PUSH = 1  # value: cell index added to the frontier
+BACKTRACK = 2  # value: cell index where DFS hit a dead end
+DONE = 3  # value: path as cell indices (start to goal), or None if no path
+
+# Above this many goals the heuristic looks goals up by row instead of
+# scanning them all
+MAX_SCANNED_GOALS = 16
+
+# Default memory bounds of the bounded searches, in entries
+DEFAULT_TABLE_SIZE = 1 << 16  # IDA* transposition table
+DEFAULT_MAX_NODES = 1 << 16  # SMA* search nodes
+
+
+class SearchScratch:
+    """
+    Reusable search state for maps of one size: reached and expanded flags,
+    distances and parent links in flat arrays. Entries only count when their
+    stamp equals the current epoch, so starting a new search bumps a counter
+    instead of clearing anything, and each search pays only for the cells
+    it touches.
+
+    The arrays are allocated by the first begin(); the memory-bounded
+    searches never call it and report the most entries they held at once
+    in peak_nodes instead.
+    """
+
+    def __init__(self, size) -> None:
+        self.size = size
+        self.epoch = 0
+        self.peak_nodes = None  # Set by IDA* and SMA*
+        self.seen = self.closed = self.distance = self.parent = None
+
+    def begin(self):
+        """Start a new search; returns the epoch that marks its entries"""
+        self.epoch += 1
+        self.peak_nodes = None
+        if self.seen is None:
+            index_type = "i" if self.size < 2 ** 31 else "q"
+            item_size = array(index_type).itemsize
+            self.distance = array(index_type, bytes(item_size * self.size))
+            self.parent = array(index_type, bytes(item_size * self.size))
+
+        if self.seen is None or self.epoch > 0xFFFFFFFF:
+            # First search, or the stamps would wrap around; clear them
+            self.seen = array("I", bytes(4 * self.size))  # Stamp: cell reached
+            self.closed = array("I", bytes(4 * self.size))  # Stamp: cell expanded
+            self.epoch = 1
+        return self.epoch
+
 
 class Pathfinder:
     @staticmethod
@@ -27,291 +89,723 @@ class Pathfinder:
         return []
 
     @staticmethod
-    def bfs(grid, win, draw_func, delay=0.02):
+    def trace_path(parent, end):
+        """Follow parent links from end back to the start cell index"""
+        path = []
+        current = end
+
+        while current != -1:
+            path.append(current)
+            current = parent[current]
+
+        path.reverse()  # Start to end
+        return path
+
+    @staticmethod
+    def goal_heuristic(grid_map, landmarks=None):
         """
-        Breadth-First Search Algorithm
-        Returns: path if found, "NO_PATH" if no path exists
+        Manhattan distance from a cell index to the nearest goal.
+        Few goals are scanned per call; many goals are looked up by row.
+        With Landmarks, the tighter ALT bound is used where it is larger.
         """
-        print("Starting BFS algorithm...")
+        if landmarks is not None:
+            return landmarks.heuristic(grid_map)
 
-        start = grid.start
-        end = grid.end
+        cols = grid_map.cols
+        goals = [grid_map.get_pos(goal) for goal in grid_map.goals]
 
-        # Basic validation
-        if start is None or end is None:
-            print("Start or end node not set!")
-            return "NO_PATH"
+        if len(goals) == 1:
+            (end_row, end_col), = goals
 
-        if start == end:
-            print("Start and end are the same!")
-            return []
+            def heuristic(index):
+                row, col = divmod(index, cols)
+                return abs(row - end_row) + abs(col - end_col)
 
-        # ✅ FIX 2: Clear visited flags before starting
-        for row in grid.grid:
-            for node in row:
-                node.is_visited = False
+            return heuristic
 
-        # Setup BFS
-        queue = deque([start])
-        visited = set([start])  # Still use set for fast lookup
-        start.previous = None
-        start.is_visited = True  # ✅ Mark start as visited
+        if len(goals) <= MAX_SCANNED_GOALS:
+            def heuristic(index):
+                row, col = divmod(index, cols)
+                return min(abs(row - goal_row) + abs(col - goal_col)
+                           for goal_row, goal_col in goals)
 
-        step = 0
-        max_steps = 10000  # Safety limit
+            return heuristic
 
-        while queue:
-            # Check for quit events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+        return Pathfinder.goal_rows_heuristic(goals, cols)
+
+    @staticmethod
+    def goal_rows_heuristic(goals, cols):
+        """
+        Manhattan distance to the nearest of many goals, kept by row with
+        sorted columns. Each call checks rows outward from the cell's own
+        and stops once the row distance alone is no better than the best
+        found, so memory stays proportional to the goals, not the map.
+        """
+        columns_by_row = {}
+        for row, col in goals:
+            columns_by_row.setdefault(row, []).append(col)
+        goal_rows = sorted(columns_by_row)
+        goal_columns = [sorted(columns_by_row[row]) for row in goal_rows]
+
+        def row_distance(col, columns):
+            """Column distance to the nearest goal in one row"""
+            at = bisect_left(columns, col)
+            if at == len(columns):
+                return col - columns[-1]
+            if at and col - columns[at - 1] < columns[at] - col:
+                return col - columns[at - 1]
+            return columns[at] - col
+
+        def heuristic(index):
+            row, col = divmod(index, cols)
+            below = bisect_left(goal_rows, row)
+            above = below - 1
+            best = None
+            while True:
+                # Take whichever unchecked goal row is nearer
+                if above < 0 or (below < len(goal_rows)
+                                 and goal_rows[below] - row <= row - goal_rows[above]):
+                    if below == len(goal_rows):
+                        return best
+                    distance = goal_rows[below] - row
+                    columns = goal_columns[below]
+                    below += 1
+                else:
+                    distance = row - goal_rows[above]
+                    columns = goal_columns[above]
+                    above -= 1
+
+                if best is not None and distance >= best:
+                    return best
+                distance += row_distance(col, columns)
+                if best is None or distance < best:
+                    best = distance
+
+        return heuristic
+
+    @staticmethod
+    def iter_search(grid_map, algorithm_name, scratch=None, **options):
+        """
+        Step through the named algorithm on a GridMap
+        Pass a SearchScratch to reuse it across searches on same-sized maps;
+        options go to the search, e.g. table_size for IDA* or max_nodes for SMA*
+        """
+        if scratch is None:
+            scratch = SearchScratch(len(grid_map.walls))
+        return SEARCHES[algorithm_name](grid_map, scratch, **options)
 
+    @staticmethod
+    def nearest_goal_paths(grid_map, starts, scratch=None):
+        """
+        Shortest path from each of several starts to its nearest goal, in
+        one BFS grown outward from all the goals at once. Moves are
+        reversible, so parent links lead from a start back to its goal.
+        Returns: dict of start -> path (start to goal), or None if no path
+        """
+        if scratch is None:
+            scratch = SearchScratch(len(grid_map.walls))
+
+        epoch = scratch.begin()
+        seen = scratch.seen
+        parent = scratch.parent
+        for goal in grid_map.goals:
+            seen[goal] = epoch
+            parent[goal] = -1
+
+        waiting = set(starts) - grid_map.goals
+        queue = deque(grid_map.goals)
+        while queue and waiting:
             current = queue.popleft()
-            step += 1
-
-            # Visualize current node
-            if current != start and current != end:
-                current.make_visited()
-
-            # Check if we reached the end
-            if current == end:
-                print(f"✓ BFS found path in {step} steps!")
-                return Pathfinder.reconstruct_path(current)
-
-            # Explore neighbors
-            for neighbor in current.neighbors:
-                # ✅ FIX 2: Check both visited set AND node.is_visited flag
-                if neighbor not in visited and not neighbor.is_visited:
-                    visited.add(neighbor)
-                    neighbor.is_visited = True  # ✅ Mark node as visited
-                    neighbor.previous = current
+            for neighbor in grid_map.neighbors(current):
+                if seen[neighbor] != epoch:
+                    seen[neighbor] = epoch
+                    parent[neighbor] = current
+                    waiting.discard(neighbor)
                     queue.append(neighbor)
 
-            # Update visualization
-            draw_func()
-            pygame.display.update()
-            time.sleep(delay)
-
-            # Safety check
-            if step > max_steps:
-                print("⚠️ BFS step limit reached")
-                break
+        paths = {}
+        for start in starts:
+            if seen[start] == epoch:
+                paths[start] = Pathfinder.trace_path(parent, start)[::-1]
+            else:
+                paths[start] = None
+        return paths
 
-        print("✗ BFS: No path exists!")
-        return "NO_PATH"
+    @staticmethod
+    def small_region(grid_map, sources, limit):
+        """
+        Cells connected to the sources, flooded while there are at most
+        limit of them
+        Returns: set of the cells, or None if the region is larger
+        """
+        region = set(sources)
+        queue = deque(region)
+        while queue:
+            for neighbor in grid_map.neighbors(queue.popleft()):
+                if neighbor not in region:
+                    region.add(neighbor)
+                    queue.append(neighbor)
+            if len(region) > limit:
+                return None
+        return region
 
     @staticmethod
-    def dijkstra(grid, win, draw_func, delay=0.02):
+    def iter_bfs(grid_map, scratch):
         """
-        Dijkstra's Algorithm
-        Returns: path if found, "NO_PATH" if no path exists
+        Breadth-First Search over a GridMap, stopping at the nearest goal
+        Yields: (event, value) pairs, ending with (DONE, path or None)
         """
-        print("Starting Dijkstra's algorithm...")
+        start = grid_map.start
+        goals = grid_map.goals
 
-        start = grid.start
-        end = grid.end
+        epoch = scratch.begin()
+        seen = scratch.seen
+        parent = scratch.parent
+        seen[start] = epoch
+        parent[start] = -1
 
-        # Basic validation
-        if start is None or end is None:
-            print("Start or end node not set!")
-            return "NO_PATH"
+        queue = deque([start])
 
-        if start == end:
-            print("Start and end are the same!")
-            return []
+        while queue:
+            current = queue.popleft()
+            yield EXPAND, current
 
-        # ✅ FIX 2: Clear visited flags before starting
-        for row in grid.grid:
-            for node in row:
-                node.is_visited = False
+            if current in goals:
+                yield DONE, Pathfinder.trace_path(parent, current)
+                return
 
-        # Initialize distances
-        distances = {}
-        for row in grid.grid:
-            for node in row:
-                distances[node] = float('inf')
-        distances[start] = 0
+            for neighbor in grid_map.neighbors(current):
+                if seen[neighbor] != epoch:
+                    seen[neighbor] = epoch
+                    parent[neighbor] = current
+                    queue.append(neighbor)
+                    yield PUSH, neighbor
 
-        # ✅ FIX 1: Add tiebreaker counter to prevent heapq comparison crash
-        counter = 0
-        pq = [(0, counter, start)]  # (distance, tiebreaker, node)
-        counter += 1
+        yield DONE, None
 
-        start.previous = None
-        start.is_visited = True  # ✅ Mark start as visited
+    @staticmethod
+    def iter_dijkstra(grid_map, scratch):
+        """
+        Dijkstra's Algorithm over a GridMap, stopping at the nearest goal
+        Yields: (event, value) pairs, ending with (DONE, path or None)
+        """
+        start = grid_map.start
+        goals = grid_map.goals
+
+        epoch = scratch.begin()
+        seen = scratch.seen
+        closed = scratch.closed
+        distances = scratch.distance
+        parent = scratch.parent
+        seen[start] = epoch
+        distances[start] = 0
+        parent[start] = -1
 
-        visited_nodes = set()
-        step = 0
-        max_steps = 10000
+        # Cell indices are ints, so they double as the heap tiebreaker
+        pq = [(0, start)]
 
         while pq:
-            # Check for quit events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-
-            # ✅ FIX 1: Unpack with tiebreaker
-            current_dist, _, current = heapq.heappop(pq)
+            current_dist, current = heapq.heappop(pq)
 
             # Skip if already processed with shorter distance
-            if current in visited_nodes:
+            if closed[current] == epoch:
                 continue
 
-            visited_nodes.add(current)
-            current.is_visited = True  # ✅ Mark as visited
-            step += 1
-
-            # Visualize current node
-            if current != start and current != end:
-                current.make_visited()
+            closed[current] = epoch
+            yield EXPAND, current
 
-            # Check if we reached the end
-            if current == end:
-                print(f"✓ Dijkstra found path in {step} steps!")
-                return Pathfinder.reconstruct_path(current)
+            if current in goals:
+                yield DONE, Pathfinder.trace_path(parent, current)
+                return
 
-            # Explore neighbors
-            for neighbor in current.neighbors:
+            for neighbor in grid_map.neighbors(current):
                 new_dist = current_dist + 1  # All edges weight = 1
 
-                if new_dist < distances[neighbor]:
+                if seen[neighbor] != epoch or new_dist < distances[neighbor]:
+                    seen[neighbor] = epoch
                     distances[neighbor] = new_dist
-                    neighbor.previous = current
-                    heapq.heappush(pq, (new_dist, counter, neighbor))
-                    counter += 1  # ✅ FIX 1: Increment counter for next node
+                    parent[neighbor] = current
+                    heapq.heappush(pq, (new_dist, neighbor))
+                    yield PUSH, neighbor
 
-            # Update visualization
-            draw_func()
-            pygame.display.update()
-            time.sleep(delay)
+        yield DONE, None
 
-            # Safety check
-            if step > max_steps:
-                print("⚠️ Dijkstra step limit reached")
-                break
+    @staticmethod
+    def iter_a_star(grid_map, scratch, landmarks=None):
+        """
+        A* Algorithm over a GridMap, stopping at the nearest goal
+        Heuristic: Manhattan distance to the nearest goal, or the ALT
+        bound when Landmarks built for the map are given
+        Yields: (event, value) pairs, ending with (DONE, path or None)
+        """
+        start = grid_map.start
+        goals = grid_map.goals
+        if not goals:
+            yield DONE, None
+            return
+
+        heuristic = Pathfinder.goal_heuristic(grid_map, landmarks)
+
+        epoch = scratch.begin()
+        seen = scratch.seen
+        closed = scratch.closed
+        g_score = scratch.distance
+        parent = scratch.parent
+        seen[start] = epoch
+        g_score[start] = 0
+        parent[start] = -1
 
-        print("✗ Dijkstra: No path exists!")
-        return "NO_PATH"
+        open_set = [(heuristic(start), start)]
+
+        while open_set:
+            _, current = heapq.heappop(open_set)
+
+            # Stale heap entry for an already expanded cell
+            if closed[current] == epoch:
+                continue
+
+            closed[current] = epoch
+            yield EXPAND, current
+
+            if current in goals:
+                yield DONE, Pathfinder.trace_path(parent, current)
+                return
+
+            for neighbor in grid_map.neighbors(current):
+                if closed[neighbor] == epoch:
+                    continue
+
+                tentative_g_score = g_score[current] + 1
+
+                if seen[neighbor] != epoch or tentative_g_score < g_score[neighbor]:
+                    seen[neighbor] = epoch
+                    parent[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    heapq.heappush(
+                        open_set, (tentative_g_score + heuristic(neighbor), neighbor))
+                    yield PUSH, neighbor
+
+        yield DONE, None
 
     @staticmethod
-    def a_star(grid, win, draw_func, delay=0.02):
+    def iter_alt(grid_map, scratch, landmarks=None):
         """
-        A* Algorithm with Manhattan distance heuristic
-        Returns: path if found, "NO_PATH" if no path exists
+        A* with ALT (A*, Landmarks, Triangle inequality) heuristics
+        Pass Landmarks built for the map to reuse them across queries;
+        without them a default set is built first
+        Yields: (event, value) pairs, ending with (DONE, path or None)
         """
-        print("Starting A* algorithm...")
+        if landmarks is None:
+            from landmarks import Landmarks  # landmarks imports this module
+            landmarks = Landmarks.build(grid_map)
+        return Pathfinder.iter_a_star(grid_map, scratch, landmarks)
 
-        start = grid.start
-        end = grid.end
+    @staticmethod
+    def iter_reduced(grid_map, scratch, reduction=None):
+        """
+        A* over a GridReduction: dead ends pruned and corridors
+        collapsed, so only junction cells are expanded
+        Pass a GridReduction kept up to date with the map to reuse it
+        across queries; without one it is built first
+        Yields: (event, value) pairs, ending with (DONE, path or None)
+        """
+        if reduction is None:
+            from reduction import GridReduction  # reduction imports this module
+            reduction = GridReduction(grid_map)
+        elif not reduction.matches(grid_map):
+            raise ValueError("Reduction was built for different walls")
 
-        # Basic validation
-        if start is None or end is None:
-            print("Start or end node not set!")
-            return "NO_PATH"
+        scratch.peak_nodes = None
+        return reduction.iter_search(grid_map.start, grid_map.goals)
 
-        if start == end:
-            print("Start and end are the same!")
-            return []
+    @staticmethod
+    def iter_dfs(grid_map, scratch):
+        """
+        Depth-First Search over a GridMap, reporting dead ends as BACKTRACK
+        Stops at the first goal it reaches, which need not be the nearest
+        Yields: (event, value) pairs, ending with (DONE, path or None)
+        """
+        start = grid_map.start
+        goals = grid_map.goals
 
-        # ✅ FIX 2: Clear visited flags before starting
-        for row in grid.grid:
-            for node in row:
-                node.is_visited = False
+        epoch = scratch.begin()
+        seen = scratch.seen
+        parent = scratch.parent
+        seen[start] = epoch
+        parent[start] = -1
 
-        # Heuristic function (Manhattan distance)
-        def heuristic(node):
-            return abs(node.row - end.row) + abs(node.col - end.col)
+        stack = [start]
 
-        # ✅ FIX 1: Add tiebreaker counter
-        tiebreaker = 0
+        while stack:
+            current = stack.pop()
+            yield EXPAND, current
 
-        # Initialize
-        open_set = []
-        heapq.heappush(open_set, (0, tiebreaker, start))
-        tiebreaker += 1
+            if current in goals:
+                yield DONE, Pathfinder.trace_path(parent, current)
+                return
 
-        g_score = {node: float('inf') for row in grid.grid for node in row}
-        g_score[start] = 0
+            has_unvisited_neighbors = False
 
-        f_score = {node: float('inf') for row in grid.grid for node in row}
-        f_score[start] = heuristic(start)
+            # Explore neighbors (in reverse order for better visualization)
+            for neighbor in reversed(grid_map.neighbors(current)):
+                if seen[neighbor] != epoch:
+                    seen[neighbor] = epoch
+                    parent[neighbor] = current
+                    stack.append(neighbor)
+                    has_unvisited_neighbors = True
+                    yield PUSH, neighbor
 
-        start.previous = None
-        start.is_visited = True  # ✅ Mark start as visited
+            if not has_unvisited_neighbors and current != start:
+                yield BACKTRACK, current
 
-        # Track which nodes are in open_set for faster lookup
-        in_open_set = {start}
+        yield DONE, None
 
-        visited_nodes = set()
-        step = 0
-        max_steps = 10000
+    @staticmethod
+    def iter_ida_star(grid_map, scratch, table_size=DEFAULT_TABLE_SIZE, landmarks=None):
+        """
+        Iterative Deepening A*: depth-first searches bounded by f = g + h,
+        raising the bound to the smallest f that exceeded it until a goal
+        is reached. Memory is the current path plus a transposition table
+        of table_size slots remembering the best g per cell this iteration,
+        which prunes repeated visits. Each cell maps to one slot and a newer
+        entry replaces an older one; a table much smaller than the area
+        searched lets IDA* revisit cells exponentially often. While the
+        table holds every cell reached, an unreachable goal is reported as
+        soon as raising the bound stops reaching new cells.
+        Yields: (event, value) pairs, ending with (DONE, path or None)
+        """
+        start = grid_map.start
+        goals = grid_map.goals
+        scratch.peak_nodes = 0
+        if not goals:
+            yield DONE, None
+            return
+
+        heuristic = Pathfinder.goal_heuristic(grid_map, landmarks)
+        bound = heuristic(start)
+        # No simple path is longer; counting the open cells would scan the map
+        longest = grid_map.rows * grid_map.cols - 1
+
+        # Transposition table: cell and g per slot, valid when stamped
+        # with the current iteration
+        slots = max(table_size, 0)
+        table_cells = array("q", bytes(8 * slots))
+        table_costs = array("i", bytes(4 * slots))
+        table_stamps = array("I", bytes(4 * slots))
+        iteration = 0
+
+        # While the table keeps every cell a pass reaches, used counts them.
+        # With a consistent heuristic a cell's f is at most 2 above that of
+        # the cell before it, so once a pass at least 2 above the first one
+        # to reach some set of cells reaches nothing more, nothing is left.
+        reached = None  # Cells reached by the last pass, if all were kept
+        reached_bound = None  # Bound of the first pass that reached them
+
+        while True:
+            iteration += 1
+            used = 0  # Slots filled this iteration
+            evicted = False  # A slot changed cells this iteration
+            yield EXPAND, start
+            if start in goals:
+                scratch.peak_nodes = 1
+                yield DONE, [start]
+                return
+
+            path = [start]
+            on_path = {start}
+            stack = [iter(grid_map.neighbors(start))]
+            next_bound = None
+
+            while stack:
+                neighbor = next(stack[-1], None)
+                if neighbor is None:
+                    # Every neighbor tried; step back
+                    stack.pop()
+                    current = path.pop()
+                    on_path.discard(current)
+                    if path:
+                        yield BACKTRACK, current
+                    continue
 
-        while open_set:
-            # Check for quit events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                if neighbor in on_path:
+                    continue
 
-            # ✅ FIX 1: Unpack with tiebreaker
-            _, _, current = heapq.heappop(open_set)
-            in_open_set.remove(current)
-            step += 1
+                g = len(path)  # All edges weight = 1
+                f = g + heuristic(neighbor)
+                if f > bound:
+                    if next_bound is None or f < next_bound:
+                        next_bound = f
+                    continue
 
-            # Visualize current node
-            if current != start and current != end:
-                current.make_visited()
-                current.is_visited = True  # ✅ Mark as visited
+                if slots:
+                    slot = neighbor % slots
+                    if table_stamps[slot] != iteration:
+                        table_stamps[slot] = iteration
+                        used += 1
+                    elif table_cells[slot] == neighbor and table_costs[slot] <= g:
+                        continue  # Already searched from here as cheaply
+                    elif table_cells[slot] != neighbor:
+                        evicted = True
+                    table_cells[slot] = neighbor
+                    table_costs[slot] = g
+
+                path.append(neighbor)
+                on_path.add(neighbor)
+                if used + len(path) > scratch.peak_nodes:
+                    scratch.peak_nodes = used + len(path)
+                yield EXPAND, neighbor
+
+                if neighbor in goals:
+                    yield DONE, path
+                    return
+
+                stack.append(iter(grid_map.neighbors(neighbor)))
+
+            if next_bound is None or next_bound > longest:
+                yield DONE, None
+                return
+
+            if not slots or evicted:
+                reached = None
+            elif used != reached:
+                reached, reached_bound = used, bound
+            elif bound >= reached_bound + 2:
+                yield DONE, None  # No goal is reachable
+                return
+            bound = next_bound
 
-            # Check if we reached the end
-            if current == end:
-                print(f"✓ A* found path in {step} steps!")
-                return Pathfinder.reconstruct_path(current)
+    @staticmethod
+    def iter_sma_star(grid_map, scratch, max_nodes=DEFAULT_MAX_NODES, landmarks=None):
+        """
+        Simplified Memory-bounded A*: A* that never holds more than
+        max_nodes search nodes. When full it forgets the open leaf with the
+        highest f, and the parent remembers that f so it can regenerate the
+        leaf once it is the best option again.
+        Finds a shortest path whenever one fits in max_nodes nodes, though
+        a tight bound can make it regenerate the same nodes many times.
+        Yields: (event, value) pairs, ending with (DONE, path or None)
+        """
+        start = grid_map.start
+        goals = grid_map.goals
+        scratch.peak_nodes = 0
+        if not goals or max_nodes < 1:
+            yield DONE, None
+            return
+
+        # Searching alone, SMA* could only rule out a path by trying every
+        # one that fits in memory. A start or goals walled into a region
+        # no larger than memory are ruled out at once by flooding it.
+        for sources, targets in (([start], goals), (goals, {start})):
+            region = Pathfinder.small_region(grid_map, sources, max_nodes)
+            if region is not None and targets.isdisjoint(region):
+                scratch.peak_nodes = len(region)
+                yield DONE, None
+                return
+
+        heuristic = Pathfinder.goal_heuristic(grid_map, landmarks)
+        infinity = float("inf")
+
+        # Per cell in memory: [g, f, parent, live children, forgotten]
+        # forgotten is None until expanded, then maps forgotten children
+        # to their f (infinity for dead ends)
+        nodes = {start: [0, heuristic(start), -1, set(), None]}
+        open_cells = {start}
+
+        # Lazy heaps over open_cells: best first (deepest on ties) for
+        # expanding, worst first (shallowest on ties) for forgetting
+        best = [(nodes[start][1], 0, start)]
+        worst = []
+
+        def reopen(cell, node):
+            open_cells.add(cell)
+            heapq.heappush(best, (node[1], -node[0], cell))
+            heapq.heappush(worst, (-node[1], node[0], cell))
+
+        def backed_up_f(node):
+            """Lowest f among the forgotten children worth regenerating"""
+            return min(node[4].values(), default=infinity)
+
+        def forget(cell, f):
+            """Drop a childless node; its parent remembers it at f"""
+            while True:
+                node = nodes.pop(cell)
+                open_cells.discard(cell)
+                if node[2] == -1:
+                    return
+
+                child, cell = cell, node[2]
+                parent = nodes[cell]
+                parent[3].discard(child)
+                parent[4][child] = f
+
+                if f < infinity:
+                    if cell not in open_cells or f < parent[1]:
+                        parent[1] = backed_up_f(parent)
+                        reopen(cell, parent)
+                    elif not parent[3]:
+                        # Now a leaf, so it can be forgotten in turn
+                        heapq.heappush(worst, (-parent[1], parent[0], cell))
+                    return
+
+                if cell in open_cells:
+                    if not parent[3]:
+                        # Now a leaf, so it can be forgotten in turn
+                        heapq.heappush(worst, (-parent[1], parent[0], cell))
+                    return
+                if parent[3] or backed_up_f(parent) < infinity:
+                    return
+                # Nothing left below the parent either
+
+        def detach(cell, parent_cell):
+            """Unlink a live child from its parent, which may become a leaf"""
+            parent = nodes[parent_cell]
+            parent[3].discard(cell)
+            if parent[3]:
+                return
+            if parent_cell in open_cells:
+                heapq.heappush(worst, (-parent[1], parent[0], parent_cell))
+            elif backed_up_f(parent) == infinity:
+                forget(parent_cell, infinity)  # Nothing left below it
+
+        def reroute(cell, node, parent_cell, g, f):
+            """
+            Move a node, with everything below it, onto a shorter route.
+            Every g and f in the subtree, remembered ones included, drops
+            by the same amount, since the rest of each path is unchanged.
+            """
+            old_parent = node[2]
+            node[2] = parent_cell
+            nodes[parent_cell][3].add(cell)
+            detach(cell, old_parent)
+
+            saved = node[0] - g
+            stack = [cell]
+            while stack:
+                below = nodes[stack.pop()]
+                below[0] -= saved
+                below[1] -= saved
+                if below[4]:
+                    for child, child_f in below[4].items():
+                        below[4][child] = child_f - saved
+                stack.extend(below[3])
+
+            node[1] = max(node[1], f)
+            stack = [cell]
+            while stack:
+                below_cell = stack.pop()
+                if below_cell in open_cells:
+                    reopen(below_cell, nodes[below_cell])  # Its f changed
+                stack.extend(nodes[below_cell][3])
+
+        def make_room(protected):
+            """Forget the worst open leaf other than protected; False if none"""
+            kept = None
+            while worst:
+                entry = heapq.heappop(worst)
+                negative_f, _, cell = entry
+                node = nodes.get(cell)
+                if (node is None or cell not in open_cells or node[3]
+                        or node[1] != -negative_f or cell == start):
+                    continue
+                if cell == protected:
+                    kept = entry
+                    continue
+                forget(cell, node[1])
+                break
+            else:
+                cell = None
+
+            if kept:
+                heapq.heappush(worst, kept)
+            return cell is not None
+
+        def compact():
+            """Rebuild both heaps without their stale entries"""
+            best[:] = [(nodes[cell][1], -nodes[cell][0], cell) for cell in open_cells]
+            worst[:] = [(-nodes[cell][1], nodes[cell][0], cell) for cell in open_cells]
+            heapq.heapify(best)
+            heapq.heapify(worst)
+
+        while best:
+            current_f, _, current = heapq.heappop(best)
+            node = nodes.get(current)
+            if node is None or current not in open_cells or node[1] != current_f:
+                continue
+            if current_f >= max_nodes:
+                break  # A path costing f needs more than max_nodes nodes
+
+            open_cells.discard(current)
+            yield EXPAND, current
+
+            if current in goals:
+                path = [current]
+                while nodes[path[-1]][2] != -1:
+                    path.append(nodes[path[-1]][2])
+                path.reverse()
+                yield DONE, path
+                return
+
+            if node[4] is None:
+                node[4] = {}
+                children = grid_map.neighbors(current)
+            else:
+                # Bring back the best forgotten child; the rest wait
+                children = [min(node[4], key=node[4].get)]
+                current_f = node[4].pop(children[0])
+
+            g = node[0] + 1  # All edges weight = 1
+            for neighbor in children:
+                known = nodes.get(neighbor)
+                if known is not None and known[0] <= g:
+                    # Reached as cheaply elsewhere, which stands in for
+                    # this route even if it is forgotten later
+                    continue
 
-            visited_nodes.add(current)
-            current.is_visited = True  # ✅ Mark as visited
+                # Pathmax keeps f from decreasing along a path
+                f = max(g + heuristic(neighbor), current_f)
+                if f >= max_nodes:
+                    continue  # Could never fit in memory
 
-            # Explore neighbors
-            for neighbor in current.neighbors:
-                if neighbor in visited_nodes:
+                if known is not None:
+                    reroute(neighbor, known, current, g, f)
+                    yield PUSH, neighbor
                     continue
 
-                tentative_g_score = g_score[current] + 1
+                if len(nodes) >= max_nodes:
+                    if not make_room(current):
+                        continue  # Memory holds nothing but the current path
+                    if current not in nodes:
+                        break  # Forgotten while making room
 
-                if tentative_g_score < g_score[neighbor]:
-                    neighbor.previous = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + heuristic(neighbor)
+                nodes[neighbor] = [g, f, current, set(), None]
+                node[3].add(neighbor)
+                reopen(neighbor, nodes[neighbor])
+                yield PUSH, neighbor
 
-                    # Add to open set if not already there
-                    if neighbor not in in_open_set:
-                        heapq.heappush(
-                            open_set, (f_score[neighbor], tiebreaker, neighbor))
-                        tiebreaker += 1  # ✅ FIX 1: Increment counter
-                        in_open_set.add(neighbor)
+            if len(nodes) > scratch.peak_nodes:
+                scratch.peak_nodes = len(nodes)
 
-            # Update visualization
-            draw_func()
-            pygame.display.update()
-            time.sleep(delay)
+            if current in nodes and current not in open_cells:
+                if backed_up_f(node) < infinity:
+                    node[1] = backed_up_f(node)
+                    reopen(current, node)
+                elif not node[3]:
+                    forget(current, infinity)  # Dead end
 
-            # Safety check
-            if step > max_steps:
-                print("⚠️ A* step limit reached")
-                break
+            if len(best) + len(worst) > 4 * max_nodes + 64:
+                compact()  # Keeps the heaps within the memory bound too
 
-        print("✗ A*: No path exists!")
-        return "NO_PATH"
+        yield DONE, None
 
     @staticmethod
-    def dfs(grid, win, draw_func, delay=0.03):
+    def animate(grid, algorithm_name, draw_func, delay):
         """
-        Depth-First Search Algorithm with backtracking visualization
+        Run a search in the foreground, coloring grid nodes as it goes
         Returns: path if found, "NO_PATH" if no path exists
         """
-        print("Starting DFS algorithm...")
+        import pygame  # Only the foreground animation needs a display
+
+        print(f"Starting {algorithm_name} algorithm...")
 
         start = grid.start
         end = grid.end
@@ -325,75 +819,96 @@ class Pathfinder:
             print("Start and end are the same!")
             return []
 
-        # ✅ FIX 2: Clear visited flags before starting
-        for row in grid.grid:
-            for node in row:
-                node.is_visited = False
-
-        # Setup DFS
-        stack = [start]
-        visited = set([start])
-        start.previous = None
-        start.is_visited = True  # ✅ Mark start as visited
-
         step = 0
-        max_steps = 10000
-        backtracking = False
+        max_steps = 10000  # Safety limit
 
-        while stack:
+        for event, value in Pathfinder.iter_search(grid.to_map(), algorithm_name):
             # Check for quit events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+            for quit_event in pygame.event.get():
+                if quit_event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
 
-            current = stack.pop()
-            step += 1
+            if event == DONE:
+                if value is None:
+                    break
 
-            # Visualize current node (different color for backtracking)
-            if current != start and current != end:
-                if backtracking:
-                    current.color = (200, 100, 200)  # Purple for backtracking
-                    backtracking = False
-                else:
-                    current.make_visited()
-                    current.is_visited = True  # ✅ Mark as visited
+                # Link previous pointers along the path
+                nodes = [grid.node_at(index) for index in value]
+                nodes[0].previous = None
+                for previous, node in zip(nodes, nodes[1:]):
+                    node.previous = previous
 
-            # Check if we reached the end
-            if current == end:
-                print(f"✓ DFS found path in {step} steps!")
-                return Pathfinder.reconstruct_path(current)
+                print(f"✓ {algorithm_name} found path in {step} steps!")
+                return Pathfinder.reconstruct_path(nodes[-1])
 
-            # Track if we have unvisited neighbors
-            has_unvisited_neighbors = False
+            node = grid.node_at(value)
 
-            # Explore neighbors (in reverse order for better visualization)
-            for neighbor in reversed(current.neighbors):
-                # ✅ FIX 2: Check both visited set AND node.is_visited flag
-                if neighbor not in visited and not neighbor.is_visited:
-                    visited.add(neighbor)
-                    neighbor.is_visited = True  # ✅ Mark node as visited
-                    neighbor.previous = current
-                    stack.append(neighbor)
-                    has_unvisited_neighbors = True
-
-            # If no unvisited neighbors, mark for backtracking
-            if not has_unvisited_neighbors and current != start:
-                backtracking = True
+            if event == BACKTRACK:
+                node.color = (200, 100, 200)  # Purple for backtracking
                 # Show backtracking longer
                 draw_func()
                 pygame.display.update()
                 time.sleep(delay * 2)
 
-            # Update visualization
-            draw_func()
-            pygame.display.update()
-            time.sleep(delay)
+            elif event == EXPAND:
+                step += 1
+                node.make_visited()
+
+                # Update visualization
+                draw_func()
+                pygame.display.update()
+                time.sleep(delay)
 
             # Safety check
             if step > max_steps:
-                print("⚠️ DFS step limit reached")
+                print(f"⚠️ {algorithm_name} step limit reached")
                 break
 
-        print("✗ DFS: No path exists!")
+        print(f"✗ {algorithm_name}: No path exists!")
         return "NO_PATH"
+
+    @staticmethod
+    def bfs(grid, win, draw_func, delay=0.02):
+        """
+        Breadth-First Search Algorithm
+        Returns: path if found, "NO_PATH" if no path exists
+        """
+        return Pathfinder.animate(grid, ALGO_BFS, draw_func, delay)
+
+    @staticmethod
+    def dijkstra(grid, win, draw_func, delay=0.02):
+        """
+        Dijkstra's Algorithm
+        Returns: path if found, "NO_PATH" if no path exists
+        """
+        return Pathfinder.animate(grid, ALGO_DIJKSTRA, draw_func, delay)
+
+    @staticmethod
+    def a_star(grid, win, draw_func, delay=0.02):
+        """
+        A* Algorithm with Manhattan distance heuristic
+        Returns: path if found, "NO_PATH" if no path exists
+        """
+        return Pathfinder.animate(grid, ALGO_ASTAR, draw_func, delay)
+
+    @staticmethod
+    def dfs(grid, win, draw_func, delay=0.03):
+        """
+        Depth-First Search Algorithm with backtracking visualization
+        Returns: path if found, "NO_PATH" if no path exists
+        """
+        return Pathfinder.animate(grid, ALGO_DFS, draw_func, delay)
+
+
+# Step generator for each algorithm name
+SEARCHES = {
+    ALGO_BFS: Pathfinder.iter_bfs,
+    ALGO_DIJKSTRA: Pathfinder.iter_dijkstra,
+    ALGO_ASTAR: Pathfinder.iter_a_star,
+    ALGO_DFS: Pathfinder.iter_dfs,
+    ALGO_IDA_STAR: Pathfinder.iter_ida_star,
+    ALGO_SMA_STAR: Pathfinder.iter_sma_star,
+    ALGO_ALT: Pathfinder.iter_alt,
+    ALGO_REDUCED: Pathfinder.iter_reduced,
+}
@@ -1,8 +1,13 @@
-import pygame
+# Display state of a GridMap cell during race mode and replays
+CELL_EMPTY = 0
+CELL_VISITED = 1
+CELL_BACKTRACK = 2
+CELL_PATH = 3
+CELL_FRONTIER = 4
 
 
 class Node:
-    def __init__(self, row, col, size) -> None:
+    def __init__(self, row, col, size, touched=None) -> None:
         self.row = row
         self.col = col
         self.size = size
@@ -18,13 +23,14 @@ class Node:
         self.is_path = False
         self.neighbors = []
         self.previous = None  # For path reconstruction
+        self.touched = touched  # Grid's set of painted nodes, if any
 
     def get_pos(self):
         return self.row, self.col
 
     def draw(self, win):
-        pygame.draw.rect(
-            win, self.color, (self.x, self.y, self.size, self.size))
+        from render import draw_node  # Loads pygame on first use
+        draw_node(win, self)
 
     def make_wall(self):
         self.color = (0, 0, 0)  # black
@@ -58,12 +64,16 @@ class Node:
         if not self.is_start and not self.is_end and not self.is_wall:
             self.color = (0, 120, 255)  # blue
             self.is_visited = True  # ✅ Set visited flag when coloring
+            if self.touched is not None:
+                self.touched.add(self)
 
     def make_path(self):
         if not self.is_start and not self.is_end:
             self.color = (255, 255, 0)  # yellow
             self.is_path = True
             self.is_visited = False
+            if self.touched is not None:
+                self.touched.add(self)
 
     def reset(self):
         self.color = (255, 255, 255)  # white
@@ -101,17 +111,28 @@ class Grid:
         self.cell_size = width // rows
 
         self.grid = []
+        self.touched = set()  # Nodes painted visited/path since the last clear
         self.start = None
-        self.end = None
+        self.goals = []  # End nodes; searches stop at the nearest one
 
         self.create_grid()
 
+    @property
+    def end(self):
+        """First end node, or None"""
+        return self.goals[0] if self.goals else None
+
+    @end.setter
+    def end(self, node):
+        self.goals = [] if node is None else [node]
+
     def create_grid(self):
         self.grid = []
+        self.touched = set()
         for r in range(self.rows):
             row = []
             for c in range(self.cols):
-                node = Node(r, c, self.cell_size)
+                node = Node(r, c, self.cell_size, self.touched)
                 row.append(node)
             self.grid.append(row)
 
@@ -123,39 +144,63 @@ class Grid:
         self.update_all_neighbors()
 
     def set_end(self, node):
-        if self.end:
-            self.end.reset()
-        self.end = node
+        """Make node the only end node"""
+        for goal in self.goals:
+            goal.reset()
+        self.goals = [node]
         node.make_end()
         self.update_all_neighbors()
 
+    def add_goal(self, node):
+        """Add another end node"""
+        if node not in self.goals:
+            self.goals.append(node)
+            node.make_end()
+            self.update_all_neighbors()
+
+    def remove_goal(self, node):
+        self.goals.remove(node)
+
     def draw(self, win):
+        from render import draw_grid  # Loads pygame on first use
+        draw_grid(win, self)
+
+    def node_at(self, index):
+        """Return the node for a flat GridMap cell index"""
+        return self.grid[index // self.cols][index % self.cols]
+
+    def to_map(self):
+        """Snapshot walls, start and end nodes into a GridMap for background searches"""
+        grid_map = GridMap(self.rows, self.cols)
         for row in self.grid:
             for node in row:
-                node.draw(win)
-
-        self.draw_grid_lines(win)
-
-    def draw_grid_lines(self, win):
-        color = (220, 220, 220)
-
-        # Horizontal lines
-        for i in range(self.rows + 1):
-            pygame.draw.line(
-                win, color,
-                (0, i * self.cell_size),
-                (self.width, i * self.cell_size),
-                1
-            )
-
-        # Vertical lines
-        for j in range(self.cols + 1):
-            pygame.draw.line(
-                win, color,
-                (j * self.cell_size, 0),
-                (j * self.cell_size, self.width),
-                1
-            )
+                if node.is_wall:
+                    grid_map.walls[grid_map.index(node.row, node.col)] = 1
+
+        if self.start:
+            grid_map.start = grid_map.index(self.start.row, self.start.col)
+        grid_map.goals = frozenset(
+            grid_map.index(goal.row, goal.col) for goal in self.goals)
+        return grid_map
+
+    def load_map(self, grid_map):
+        """Replace walls, start and end nodes with those of a same-sized GridMap"""
+        self.start = None
+        self.goals = []
+        self.create_grid()
+
+        for index, wall in enumerate(grid_map.walls):
+            if wall:
+                self.node_at(index).make_wall()
+
+        if grid_map.start is not None:
+            self.start = self.node_at(grid_map.start)
+            self.start.make_start()
+        for goal in sorted(grid_map.goals):
+            self.goals.append(self.node_at(goal))
+            self.node_at(goal).make_end()
+
+        self.update_all_neighbors()
 
     def get_node_from_pos(self, pos):
         x, y = pos
@@ -174,22 +219,22 @@ class Grid:
 
     def reset_grid(self):
         self.start = None
-        self.end = None
+        self.goals = []
         self.create_grid()
 
     def clear_path(self):
-        for row in self.grid:
-            for node in row:
-                # ✅ Reset visited flags and path flags but keep walls, start, end
-                if node.is_visited or node.is_path:
-                    node.reset()
-                elif node.is_start:
-                    node.make_start()
-                elif node.is_end:
-                    node.make_end()
-                # Walls remain as walls
+        # Only nodes painted since the last clear need resetting
+        for node in self.touched:
+            if node.is_visited or node.is_path:
+                node.reset()
+                node.update_neighbors(self.grid)
+        self.touched.clear()
 
-        self.update_all_neighbors()
+        # Keep walls, start and end nodes
+        if self.start:
+            self.start.make_start()
+        for goal in self.goals:
+            goal.make_end()
 
     def update_all_neighbors(self):
         for row in self.grid:
@@ -200,3 +245,61 @@ class Grid:
         if path:
             for node in path:
                 node.make_path()
+
+
+class GridMap:
+    """
+    Compact, pygame-free copy of a grid used by background searches.
+    Cells are addressed by a flat index (row * cols + col) and walls are
+    stored one byte per cell, so a map is cheap to copy between threads
+    and processes. walls may also be a read-only memoryview, as with maps
+    attached from shared memory.
+    """
+
+    def __init__(self, rows, cols, walls=None, start=None, goals=()) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.walls = walls if walls is not None else bytearray(rows * cols)
+        self.start = start  # Cell index or None
+        self.goals = frozenset(goals)  # Cell indices of the end nodes
+
+    @property
+    def end(self):
+        """Lowest goal index, for callers that only need one; None if no goals"""
+        return min(self.goals) if self.goals else None
+
+    @end.setter
+    def end(self, index):
+        self.goals = frozenset() if index is None else frozenset([index])
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def open_count(self, chunk_size=1 << 20):
+        """Number of cells that are not walls"""
+        # Chunked, so walls in shared memory are never copied whole
+        with memoryview(self.walls) as walls:
+            return sum(walls[i:i + chunk_size].tobytes().count(0)
+                       for i in range(0, len(walls), chunk_size))
+
+    def get_pos(self, index):
+        return divmod(index, self.cols)
+
+    def neighbors(self, index):
+        """Open neighbors of a cell, in the same order as Node.update_neighbors"""
+        cols = self.cols
+        walls = self.walls
+        result = []
+
+        if index >= cols and not walls[index - cols]:
+            result.append(index - cols)
+        if index + cols < len(walls) and not walls[index + cols]:
+            result.append(index + cols)
+
+        col = index % cols
+        if col > 0 and not walls[index - 1]:
+            result.append(index - 1)
+        if col < cols - 1 and not walls[index + 1]:
+            result.append(index + 1)
+
+        return result
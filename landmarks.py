@@ -0,0 +1,306 @@
+import random
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+
+from algorithms import Pathfinder
+
+# File layout:
+#   header   magic, version, rows, cols, crc32 of the walls, landmark count,
+#            table typecode
+#   cells    landmark cell indices, 8 bytes each
+#   tables   zlib-compressed distance tables, little-endian, one after another
+MAGIC = b"PVLM"
+VERSION = 1
+HEADER = struct.Struct("<4sBIIIHc")
+
+DEFAULT_COUNT = 8
+STRATEGIES = ("farthest", "avoid")
+
+
+def distance_table(grid_map, source, typecode="I"):
+    """
+    BFS distance from source to every cell; cells it cannot reach get the
+    largest value the typecode holds
+    """
+    unreachable = (1 << 8 * array(typecode).itemsize) - 1
+    table = array(typecode, [unreachable]) * len(grid_map.walls)
+    table[source] = 0
+
+    neighbors = grid_map.neighbors
+    frontier = [source]
+    distance = 0
+    while frontier:
+        distance += 1
+        next_frontier = []
+        for cell in frontier:
+            for neighbor in neighbors(cell):
+                if table[neighbor] == unreachable:
+                    table[neighbor] = distance
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+
+    return table
+
+
+class Landmarks:
+    """
+    ALT preprocessing for one map: BFS distance tables from K landmark
+    cells. By the triangle inequality, |d(L, goal) - d(L, cell)| never
+    overestimates the distance from cell to goal, and on mazes it is far
+    tighter than the Manhattan distance.
+    The tables depend only on the walls, so they stay valid while the
+    start and goals move; matches() tells when the walls have changed.
+    """
+
+    def __init__(self, rows, cols, wall_crc, cells, tables) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.wall_crc = wall_crc
+        self.cells = cells  # Landmark cell indices
+        self.tables = tables  # One distance table per landmark (arrays or memoryviews)
+        itemsize = tables[0].itemsize if tables else array("I").itemsize
+        self.unreachable = (1 << 8 * itemsize) - 1
+        self._verified = None  # Read-only walls already found to match
+
+    def __getstate__(self):
+        return {**self.__dict__, "_verified": None}
+
+    @classmethod
+    def build(cls, grid_map, count=DEFAULT_COUNT, strategy="farthest", seed=0):
+        """
+        Pick up to count landmarks and compute their distance tables
+        strategy: "farthest" spreads them out, each as far as possible from
+        those already chosen; "avoid" puts them behind the regions the
+        current landmarks cover worst, which is slower but usually tighter
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown landmark strategy {strategy!r}")
+
+        size = len(grid_map.walls)
+        typecode = "H" if size < 0xFFFF else "I"
+        rng = random.Random(seed)
+        cells = []
+        tables = []
+
+        open_cells = grid_map.open_count()
+        if open_cells:
+            # Begin at the cell farthest from a random open cell
+            start = _random_open_cell(grid_map, rng)
+            cells.append(_farthest(distance_table(grid_map, start, typecode), ()))
+            tables.append(distance_table(grid_map, cells[0], typecode))
+
+        choose = _farthest_from_all if strategy == "farthest" else _avoid
+        while len(cells) < min(count, open_cells):
+            cell = choose(grid_map, cells, tables, rng)
+            if cell is None or cell in cells:
+                break  # The component is covered
+            cells.append(cell)
+            tables.append(distance_table(grid_map, cell, typecode))
+
+        return cls(grid_map.rows, grid_map.cols, zlib.crc32(grid_map.walls), cells, tables)
+
+    def matches(self, grid_map):
+        """
+        True if the tables were built for these walls. Read-only walls,
+        such as a shared map's, cannot change, so they are checksummed
+        once and later queries on them skip the O(map) check.
+        """
+        walls = grid_map.walls
+        if walls is self._verified:
+            return True
+        if ((self.rows, self.cols) != (grid_map.rows, grid_map.cols)
+                or self.wall_crc != zlib.crc32(walls)):
+            return False
+        if isinstance(walls, memoryview) and walls.readonly:
+            self._verified = walls
+        return True
+
+    def heuristic(self, grid_map):
+        """
+        Lower bound on the distance from a cell index to the nearest goal:
+        the larger of the Manhattan distance and the best landmark bound
+        """
+        if not self.matches(grid_map):
+            raise ValueError("Landmarks were built for different walls")
+
+        manhattan = Pathfinder.goal_heuristic(grid_map)
+        unreachable = self.unreachable
+
+        # Per landmark, the sorted distances to the goals it can reach.
+        # Goals it cannot reach are in another component than the cells
+        # it can, so they never bound a reachable cell.
+        bounds = []
+        for table in self.tables:
+            goal_distances = sorted({table[goal] for goal in grid_map.goals} - {unreachable})
+            if goal_distances:
+                bounds.append((table, goal_distances))
+
+        if len(grid_map.goals) == 1:
+            pairs = [(table, goal_distances[0]) for table, goal_distances in bounds]
+
+            def heuristic(index):
+                best = manhattan(index)
+                for table, goal_distance in pairs:
+                    distance = table[index]
+                    if distance != unreachable:
+                        bound = abs(goal_distance - distance)
+                        if bound > best:
+                            best = bound
+                return best
+
+            return heuristic
+
+        def heuristic(index):
+            best = manhattan(index)
+            for table, goal_distances in bounds:
+                distance = table[index]
+                if distance == unreachable:
+                    continue
+
+                # Closest goal distance to this cell's, found by bisection
+                i = bisect_left(goal_distances, distance)
+                bound = goal_distances[i] - distance if i < len(goal_distances) else distance
+                if i:
+                    bound = min(bound, distance - goal_distances[i - 1])
+                if bound > best:
+                    best = bound
+            return best
+
+        return heuristic
+
+    def save(self, path):
+        """Write the landmarks and their tables to path"""
+        typecode = self.tables[0].typecode if self.tables else "I"
+        compressor = zlib.compressobj()
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.rows, self.cols, self.wall_crc,
+                                   len(self.cells), typecode.encode("ascii")))
+            file.write(struct.pack(f"<{len(self.cells)}q", *self.cells))
+            for table in self.tables:
+                if sys.byteorder == "big":
+                    table = array(typecode, table)
+                    table.byteswap()
+                file.write(compressor.compress(table))
+            file.write(compressor.flush())
+
+    @classmethod
+    def load(cls, path):
+        """Read landmarks written by save()"""
+        with open(path, "rb") as file:
+            magic, version, rows, cols, wall_crc, count, typecode = \
+                HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Not a landmarks file (or unsupported version)")
+
+            cells = list(struct.unpack(f"<{count}q", file.read(8 * count)))
+            data = zlib.decompress(file.read())
+
+        typecode = typecode.decode("ascii")
+        table_bytes = array(typecode).itemsize * rows * cols
+        tables = []
+        for i in range(count):
+            table = array(typecode, data[i * table_bytes:(i + 1) * table_bytes])
+            if sys.byteorder == "big":
+                table.byteswap()
+            tables.append(table)
+        return cls(rows, cols, wall_crc, cells, tables)
+
+    @classmethod
+    def load_for(cls, path, grid_map):
+        """Landmarks saved at path if they match the map's walls, else None"""
+        try:
+            landmarks = cls.load(path)
+        except (OSError, ValueError, struct.error, zlib.error):
+            return None
+        return landmarks if landmarks.matches(grid_map) else None
+
+
+def _random_open_cell(grid_map, rng):
+    while True:
+        cell = int(rng.random() * len(grid_map.walls))
+        if not grid_map.walls[cell]:
+            return cell
+
+
+def _farthest(table, exclude):
+    """Reachable cell with the largest value in table, or None"""
+    unreachable = (1 << 8 * table.itemsize) - 1
+    best = None
+    best_value = -1
+    for cell, value in enumerate(table):
+        if best_value < value != unreachable and cell not in exclude:
+            best = cell
+            best_value = value
+    return best
+
+
+def _farthest_from_all(grid_map, cells, tables, rng):
+    """Cell whose distance to the nearest chosen landmark is largest"""
+    nearest = array(tables[0].typecode, tables[0])
+    for table in tables[1:]:
+        for cell, value in enumerate(table):
+            if value < nearest[cell]:
+                nearest[cell] = value
+    return _farthest(nearest, cells)
+
+
+def _avoid(grid_map, cells, tables, rng):
+    """
+    Avoid strategy: grow a BFS tree from a random root and weigh each cell
+    by how much the current landmarks underestimate its distance from the
+    root. Descend into the heaviest subtree that holds no landmark and use
+    the leaf it ends at.
+    """
+    unreachable = (1 << 8 * tables[0].itemsize) - 1
+    root = _random_open_cell(grid_map, rng)
+    if tables[0][root] == unreachable:
+        return None  # Outside the landmarks' component
+
+    # BFS tree from the root, cells in visiting order
+    size = len(grid_map.walls)
+    parent = array("q", [-1]) * size
+    distance = array("q", [-1]) * size
+    distance[root] = 0
+    order = [root]
+    for cell in order:
+        for neighbor in grid_map.neighbors(cell):
+            if distance[neighbor] == -1:
+                distance[neighbor] = distance[cell] + 1
+                parent[neighbor] = cell
+                order.append(neighbor)
+
+    # Weight: true distance minus the best landmark lower bound
+    root_distances = [table[root] for table in tables]
+    weight = array("q", bytes(8 * size))
+    for cell in order:
+        bound = max(abs(root_distance - table[cell])
+                    for root_distance, table in zip(root_distances, tables))
+        weight[cell] = distance[cell] - bound
+
+    # Subtree sizes, bottom up; subtrees holding a landmark weigh nothing
+    is_landmark = set(cells)
+    blocked = bytearray(size)
+    for cell in reversed(order):
+        if cell in is_landmark:
+            blocked[cell] = 1
+        if blocked[cell]:
+            weight[cell] = 0
+        if cell != root:
+            up = parent[cell]
+            weight[up] += weight[cell]
+            blocked[up] |= blocked[cell]
+
+    if not weight[root]:
+        return _farthest_from_all(grid_map, cells, tables, rng)
+
+    # Follow the heaviest child down to a leaf
+    current = root
+    while True:
+        children = [neighbor for neighbor in grid_map.neighbors(current)
+                    if parent[neighbor] == current and weight[neighbor] > 0]
+        if not children:
+            return current
+        current = max(children, key=weight.__getitem__)
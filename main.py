@@ -1,142 +1,61 @@
-import pygame
-import sys
+import io
+import os
+import random
+import struct
+import time
+import zlib
+from collections import deque
 from grid import Grid
-from algorithms import Pathfinder
+from algorithms import (ALGO_ALT, ALGO_ASTAR, ALGO_BFS, ALGO_DFS, ALGO_DIJKSTRA,
+                        ALGO_IDA_STAR, ALGO_REDUCED, ALGO_SMA_STAR, BACKTRACK,
+                        DONE, EXPAND)
+from landmarks import Landmarks
+from mapgen import GENERATORS, generate
+from race import RaceRunner
+from recording import Recording, RecordingWriter, Replay
+from reduction import GridReduction
+from worker import SearchWorker
 
-print("Pathfinding Visualizer - All Algorithms successfully integrated!")
-
-pygame.init()
-
-WIDTH, HEIGHT = 600, 700
 ROWS, COLS = 20, 20
 
-Window = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pathfinding Visualizer")
-clock = pygame.time.Clock()
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-BLUE = (0, 120, 255)
-GREY = (200, 200, 200)
-DARK_GREY = (50, 50, 50)
-YELLOW = (255, 255, 0)
-PURPLE = (180, 0, 255)
-ORANGE = (255, 165, 0)
-CYAN = (100, 200, 255)  # For frontier nodes
-
-FONT = pygame.font.SysFont('arial', 20)
-TITLE_FONT = pygame.font.SysFont('arial', 24, bold=True)
-
-# Algorithm constants
-ALGO_DIJKSTRA = "Dijkstra"
-ALGO_ASTAR = "A*"
-ALGO_BFS = "BFS"
-ALGO_DFS = "DFS"
-
-ALGORITHMS = {
-    pygame.K_1: ALGO_BFS,
-    pygame.K_2: ALGO_DIJKSTRA,
-    pygame.K_3: ALGO_ASTAR,
-    pygame.K_4: ALGO_DFS
+# Expanded cells animated per frame while a search is streaming in
+STEPS_PER_FRAME = 1
+
+# Where S saves and L loads the last search recording
+RECORDING_FILE = "last_search.pvrec"
+LANDMARKS_FILE = "last_search.pvlm"  # ALT tables for the recording's map
+
+# Keys that select an algorithm
+ALGORITHM_KEYS = {
+    "1": ALGO_BFS,
+    "2": ALGO_DIJKSTRA,
+    "3": ALGO_ASTAR,
+    "4": ALGO_DFS,
+    "5": ALGO_IDA_STAR,
+    "6": ALGO_SMA_STAR,
+    "7": ALGO_ALT,
+    "8": ALGO_REDUCED
 }
 
 
-def draw_info_panel(win, current_algo, algorithm_running):
-    """Draw information panel at the bottom"""
-    panel_height = 120
-    pygame.draw.rect(win, DARK_GREY, (0, HEIGHT -
-                     panel_height, WIDTH, panel_height))
-
-    # Title
-    title = TITLE_FONT.render("Pathfinding Visualizer", True, ORANGE)
-    win.blit(title, (WIDTH // 2 - title.get_width() //
-             2, HEIGHT - panel_height + 10))
-
-    # Status
-    status_color = YELLOW if algorithm_running else GREEN
-    status_text = f"RUNNING: {current_algo}" if algorithm_running else "READY"
-    status = FONT.render(f"Status: {status_text}", True, status_color)
-    win.blit(status, (10, HEIGHT - panel_height + 40))
-
-    # Instructions
-    instructions = [
-        "Left Click: Place Start → End → Walls",
-        "Right Click: Remove Node",
-        "1-4: Select Algorithm (1:BFS, 2:Dijkstra, 3:A*, 4:DFS)",
-        "Space: Start Algorithm | R: Reset Grid | C: Clear Path"
-    ]
-
-    for i, text in enumerate(instructions):
-        text_surface = FONT.render(text, True, WHITE)
-        win.blit(text_surface, (10, HEIGHT - panel_height + 60 + i * 20))
-
-    # Legend
-    legend_items = [
-        (GREEN, "Start"),
-        (RED, "End"),
-        (BLACK, "Wall"),
-        (BLUE, "Visited"),
-        (YELLOW, "Path")
-    ]
-
-    for i, (color, label) in enumerate(legend_items):
-        pygame.draw.rect(win, color, (WIDTH - 200, HEIGHT -
-                         panel_height + 65 + i * 25, 20, 20))
-        label_surface = FONT.render(label, True, WHITE)
-        win.blit(label_surface, (WIDTH - 175,
-                 HEIGHT - panel_height + 65 + i * 25))
-
-
-def draw(win, grid, algorithm_name, algorithm_running=False):
-    win.fill(WHITE)
-    grid.draw(win)
-    draw_info_panel(win, algorithm_name, algorithm_running)
-
-    # Algorithm status text at top
-    if algorithm_running:
-        # Red when running
-        text = FONT.render(f"Running: {algorithm_name}", True, (255, 0, 0))
-    elif algorithm_name:
-        # Black when selected
-        text = FONT.render(f"Selected: {algorithm_name}", True, (0, 0, 0))
-        win.blit(text, (10, 10))
-
-    pygame.display.update()
-
-
-def show_no_path_message(grid):
-    """Show 'No Path Exists' message on grid"""
-    # Create semi-transparent overlay
-    overlay = pygame.Surface((grid.width, grid.width), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))  # Semi-transparent black
-    Window.blit(overlay, (0, 0))
-
-    # Display message
-    font = pygame.font.SysFont('arial', 36, bold=True)
-    message = font.render("NO PATH EXISTS!", True, (255, 50, 50))
-    Window.blit(message, (grid.width//2 - message.get_width()//2,
-                          grid.width//2 - message.get_height()//2 - 30))
-
-    font2 = pygame.font.SysFont('arial', 24)
-    message2 = font2.render(
-        "Press any key to continue...", True, (255, 255, 255))
-    Window.blit(message2, (grid.width//2 - message2.get_width()//2,
-                           grid.width//2 + 20))
-
-    pygame.display.update()
-
-    # Wait for user input
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                waiting = False
+def print_race_summary(race):
+    """Print the race results as a table"""
+    print(f"{'Algorithm':<12}{'Expanded':>10}{'Cost':>8}{'Time (ms)':>12}{'Peak':>8}")
+    for result in race.summary():
+        cost = "-" if result.path_cost is None else result.path_cost
+        peak = "-" if result.peak_nodes is None else result.peak_nodes
+        print(f"{result.algorithm_name:<12}{result.expansions:>10}"
+              f"{cost:>8}{result.wall_time * 1000:>12.2f}{peak:>8}")
+
+
+def save_recording(recording, landmarks):
+    """Save a recording, plus the landmarks for its map if they are current"""
+    recording.save(RECORDING_FILE)
+    print(f"Saved recording to {RECORDING_FILE}")
+
+    if landmarks is not None and landmarks.matches(recording.grid_map()):
+        landmarks.save(LANDMARKS_FILE)
+        print(f"Saved landmarks to {LANDMARKS_FILE}")
 
 
 def validate_grid_setup(grid):
@@ -149,7 +68,7 @@ def validate_grid_setup(grid):
         print("Error: Please set an END point (red)")
         return False
 
-    if grid.start == grid.end:
+    if grid.start in grid.goals:
         print("Error: Start and End cannot be the same")
         return False
 
@@ -157,25 +76,160 @@ def validate_grid_setup(grid):
 
 
 def main():
-    grid_width = min(WIDTH, HEIGHT - 120)
+    # pygame and the drawing code are only loaded once a window is needed
+    import pygame
+    import render
+
+    print("Pathfinding Visualizer - All Algorithms successfully integrated!")
+
+    pygame.init()
+    window = render.init_window()
+    clock = pygame.time.Clock()
+
+    algorithms = {pygame.key.key_code(key): name
+                  for key, name in ALGORITHM_KEYS.items()}
+
+    grid_width = min(render.WIDTH, render.HEIGHT - 120)
     grid = Grid(ROWS, COLS, grid_width)
+    worker = SearchWorker()
 
     # State variables
     algorithm_running = False
     current_algorithm = ALGO_BFS  # Default algorithm
+    pending_events = deque()  # Search events waiting to be animated
+    no_path = False
+    race = None  # RaceRunner while the race view is shown
+    recorder = None  # RecordingWriter for the running search
+    last_recording = None
+    landmarks = None  # ALT tables, rebuilt only when the walls change
+    reduction = None  # Pruned search graph, updated as walls are edited
+    replay = None  # Replay while the replay view is shown
+    replay_playing = False
+    replay_speed = 1.0  # Steps per frame
+    replay_carry = 0.0
+    generator_names = list(GENERATORS)
+    next_generator = 0
     mouse_down = False
     mouse_button = None
     last_node_pos = None
 
+    def discard_search(reason):
+        """Cancel the background search and drop anything it produced"""
+        nonlocal algorithm_running
+        if algorithm_running:
+            worker.cancel()
+            pending_events.clear()
+            algorithm_running = False
+            grid.clear_path()
+            print(reason)
+
+    def current_landmarks(grid_map):
+        """Landmarks for the map's walls, reusing the last ones if still valid"""
+        nonlocal landmarks
+        if landmarks is None or not landmarks.matches(grid_map):
+            started = time.perf_counter()
+            landmarks = Landmarks.build(grid_map)
+            print(f"Built {len(landmarks.cells)} landmarks in "
+                  f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return landmarks
+
+    def current_reduction(grid_map):
+        """Reduced graph for the map's walls, updating the last one in place"""
+        nonlocal reduction
+        worker.wait()  # A cancelled search may still be reading it
+        started = time.perf_counter()
+        if reduction is None or (reduction.rows, reduction.cols) != (grid_map.rows, grid_map.cols):
+            reduction = GridReduction(grid_map)
+            action = "Built reduced graph"
+        else:
+            edited = reduction.update(grid_map)
+            if not edited:
+                return reduction
+            action = f"Updated reduced graph for {edited} edited cells"
+
+        stats = reduction.stats()
+        print(f"{action} in {(time.perf_counter() - started) * 1000:.0f} ms: "
+              f"{stats.open_cells} open cells -> {stats.junctions} junctions, "
+              f"{stats.edges} edges ({stats.ratio:.0%} pruned)")
+        return reduction
+
+    def open_replay(recording):
+        """Switch to the replay view; the grid takes the recorded walls"""
+        nonlocal replay, replay_playing, replay_speed, replay_carry
+        if (recording.rows, recording.cols) != (ROWS, COLS):
+            print(f"Error: Recording is {recording.rows}x{recording.cols}, "
+                  f"the grid is {ROWS}x{COLS}")
+            return
+
+        discard_search("Search cancelled")
+        grid.load_map(recording.grid_map())
+        replay = Replay(recording)
+        replay_playing = True
+        replay_speed = 1.0
+        replay_carry = 0.0
+        pygame.key.set_repeat(300, 30)
+        print(f"Replaying {recording.algorithm_name} ({recording.event_count} steps)")
+
     run = True
     while run:
         clock.tick(60)
-        draw(Window, grid, current_algorithm, algorithm_running)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
 
+            elif race:
+                # The race view only listens for the keys that close it
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_m):
+                    race.stop()
+                    race = None
+
+            elif replay:
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_ESCAPE, pygame.K_p):
+                        replay = None
+                        pygame.key.set_repeat()
+                        grid.clear_path()
+                    elif event.key == pygame.K_SPACE:
+                        if replay.step == replay.total:
+                            replay.seek(0)
+                        replay_playing = not replay_playing
+                    elif event.key == pygame.K_RIGHT:
+                        replay_playing = False
+                        replay.forward()
+                    elif event.key == pygame.K_LEFT:
+                        replay_playing = False
+                        replay.back()
+                    elif event.key == pygame.K_UP:
+                        replay_speed = min(replay_speed * 2, 4096)
+                    elif event.key == pygame.K_DOWN:
+                        replay_speed = max(replay_speed / 2, 1 / 16)
+                    elif event.key == pygame.K_HOME:
+                        replay.seek(0)
+                    elif event.key == pygame.K_END:
+                        replay.seek(replay.total)
+                    elif event.key == pygame.K_s:
+                        save_recording(replay.recording, landmarks)
+
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    mouse_down = True
+                    target = render.scrub_target(replay, pygame.mouse.get_pos())
+                    if target is not None:
+                        replay_playing = False
+                        replay.seek(target)
+
+                elif event.type == pygame.MOUSEBUTTONUP:
+                    mouse_down = False
+
+                elif event.type == pygame.MOUSEMOTION and mouse_down:
+                    target = render.scrub_target(replay, pygame.mouse.get_pos())
+                    if target is not None:
+                        replay.seek(target)
+
+            elif no_path and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                # Dismiss the "No Path Exists" overlay
+                no_path = False
+
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_down = True
                 mouse_button = event.button
@@ -189,7 +243,10 @@ def main():
                         if node is None:
                             continue
 
-                        handle_mouse_click(node, mouse_button, grid)
+                        # Editing invalidates the search in progress
+                        discard_search("Grid edited - search discarded")
+                        shift = pygame.key.get_mods() & pygame.KMOD_SHIFT
+                        handle_mouse_click(node, mouse_button, grid, shift)
                         last_node_pos = (node.row, node.col)
 
             elif event.type == pygame.MOUSEBUTTONUP:
@@ -206,57 +263,153 @@ def main():
                         continue
 
                     if grid.start and grid.end:
+                        discard_search("Grid edited - search discarded")
                         handle_mouse_drag(node, grid)
                         last_node_pos = (node.row, node.col)
 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:  # Reset grid
+                    discard_search("Search cancelled")
                     grid.reset_grid()
-                    algorithm_running = False
                     current_algorithm = ALGO_BFS
                     print("Grid reset")
 
                 elif event.key == pygame.K_c:  # Clear path only
-                    if not algorithm_running:
-                        grid.clear_path()
-                        algorithm_running = False
-                        print("Cleared path")
+                    discard_search("Search cancelled")
+                    grid.clear_path()
+                    print("Cleared path")
+
+                elif event.key == pygame.K_g:  # Generate the next map type
+                    discard_search("Search cancelled")
+                    name = generator_names[next_generator]
+                    next_generator = (next_generator + 1) % len(generator_names)
+                    seed = random.randrange(1 << 32)
+                    grid.load_map(generate(name, ROWS, COLS, seed=seed))
+                    print(f"Generated {name} map (seed {seed})")
+
+                elif event.key == pygame.K_p:  # Replay the last search
+                    if last_recording is None:
+                        print("Error: Run a search first to record it")
+                    else:
+                        open_replay(last_recording)
+
+                elif event.key == pygame.K_s:  # Save the last recording
+                    if last_recording is None:
+                        print("Error: Run a search first to record it")
+                    else:
+                        save_recording(last_recording, landmarks)
+
+                elif event.key == pygame.K_l:  # Load a saved recording
+                    if not os.path.exists(RECORDING_FILE):
+                        print(f"Error: {RECORDING_FILE} not found")
+                    else:
+                        try:
+                            loaded = Recording(RECORDING_FILE)
+                        except (OSError, ValueError, struct.error, zlib.error) as error:
+                            print(f"Error: Could not load {RECORDING_FILE}: {error}")
+                            continue
+                        last_recording = loaded
+                        saved = Landmarks.load_for(LANDMARKS_FILE, last_recording.grid_map())
+                        if saved is not None:
+                            landmarks = saved
+                        open_replay(last_recording)
+
+                elif event.key == pygame.K_ESCAPE:  # Cancel running search
+                    discard_search("Search cancelled")
 
                 elif event.key == pygame.K_SPACE and not algorithm_running:
                     # Validate grid setup before running algorithm
                     if not validate_grid_setup(grid):
                         continue
 
-                    # Start algorithm
-                    algorithm_running = True
-                    draw(Window, grid, current_algorithm, algorithm_running)
+                    options = {}
+                    if current_algorithm == ALGO_ALT:
+                        options["landmarks"] = current_landmarks(grid.to_map())
+                    elif current_algorithm == ALGO_REDUCED:
+                        options["reduction"] = current_reduction(grid.to_map())
 
-                    # Run selected algorithm
-                    path = run_algorithm(grid, current_algorithm)
+                    # Start algorithm in the background
+                    recorder = start_search(worker, grid, current_algorithm, **options)
+                    algorithm_running = True
 
-                    # Handle results
-                    if path == "NO_PATH":
-                        show_no_path_message(grid)
-                    elif path:
-                        # Color the path
-                        for node in path:
-                            if node != grid.start and node != grid.end:
-                                node.make_path()
-                        print(f"✓ Path found with {len(path)} steps")
+                elif event.key == pygame.K_m:  # Race all algorithms
+                    if not validate_grid_setup(grid):
+                        continue
 
-                    algorithm_running = False
-                    draw(Window, grid, current_algorithm, algorithm_running)
+                    discard_search("Search cancelled")
+                    grid.clear_path()
+                    grid_map = grid.to_map()
+                    race = RaceRunner(grid_map, options={
+                        ALGO_ALT: {"landmarks": current_landmarks(grid_map)},
+                        ALGO_REDUCED: {"reduction": current_reduction(grid_map)}})
+                    race.start()
+                    print("Racing: " + ", ".join(
+                        lane.algorithm_name for lane in race.lanes))
 
                 # Algorithm selection
-                elif event.key in ALGORITHMS and not algorithm_running:
-                    current_algorithm = ALGORITHMS[event.key]
+                elif event.key in algorithms and not algorithm_running:
+                    current_algorithm = algorithms[event.key]
                     print(f"Selected algorithm: {current_algorithm}")
 
+        if algorithm_running:
+            new_events = worker.poll()
+            for event, value in new_events:
+                recorder.add(event, value)
+                if event == DONE:
+                    recorder.close()
+                    last_recording = Recording(recorder.file.getvalue())
+
+            pending_events.extend(new_events)
+            path = animate_search(grid, pending_events, STEPS_PER_FRAME)
+
+            # Handle results
+            if path is not None:
+                algorithm_running = False
+                if path == "NO_PATH":
+                    print(f"✗ {current_algorithm}: No path exists!")
+                    no_path = True
+                else:
+                    # Color the path
+                    for node in path:
+                        if not (node.is_start or node.is_end):
+                            node.make_path()
+                    print(f"✓ Path found with {len(path)} steps")
+
+                if worker.scratch.peak_nodes is not None:
+                    print(f"Peak memory: {worker.scratch.peak_nodes} search nodes")
+
+        if replay:
+            if replay_playing:
+                replay_carry += replay_speed
+                steps = int(replay_carry)
+                replay_carry -= steps
+                replay.forward(steps)
+                if replay.step == replay.total:
+                    replay_playing = False
+
+            render.sync_replay(grid, replay)
+            render.draw_replay(window, grid, replay, replay_playing, replay_speed)
+            continue
+
+        if race:
+            was_done = race.done
+            race.poll()
+            race.animate(STEPS_PER_FRAME)
+            if race.done and not was_done:
+                print_race_summary(race)
+            render.draw_race(window, grid, race)
+            continue
+
+        render.draw(window, grid, current_algorithm, algorithm_running, no_path)
+
+    if race:
+        race.stop()
+    worker.cancel()
     pygame.quit()
 
 
-def handle_mouse_click(node, button, grid):
-    """Handle single mouse click"""
+def handle_mouse_click(node, button, grid, shift=False):
+    """Handle single mouse click; shift-clicking adds another end node"""
     if button == 1:  # Left click
         if not grid.start:
             grid.set_start(node)
@@ -264,7 +417,10 @@ def handle_mouse_click(node, button, grid):
         elif not grid.end and node != grid.start:
             grid.set_end(node)
             print(f"End set at: ({node.row}, {node.col})")
-        elif node != grid.start and node != grid.end:
+        elif shift and not (node.is_start or node.is_end):
+            grid.add_goal(node)
+            print(f"Extra end set at: ({node.row}, {node.col})")
+        elif node != grid.start and not node.is_end:
             if not (node.is_start or node.is_end or node.is_visited or node.is_path):
                 node.make_wall()
                 grid.update_all_neighbors()
@@ -273,8 +429,8 @@ def handle_mouse_click(node, button, grid):
         if node == grid.start:
             grid.start = None
             print("Start removed")
-        elif node == grid.end:
-            grid.end = None
+        elif node.is_end:
+            grid.remove_goal(node)
             print("End removed")
 
         node.reset()
@@ -283,39 +439,50 @@ def handle_mouse_click(node, button, grid):
 
 def handle_mouse_drag(node, grid):
     """Handle mouse drag for wall placement"""
-    if node != grid.start and node != grid.end:
+    if node != grid.start and not node.is_end:
         if not (node.is_start or node.is_end or node.is_visited or node.is_path):
             if not node.is_wall:
                 node.make_wall()
                 grid.update_all_neighbors()
 
 
-def run_algorithm(grid, algorithm_name):
-    """Run the selected pathfinding algorithm"""
+def start_search(worker, grid, algorithm_name, **options):
+    """
+    Start the selected pathfinding algorithm on a background thread
+    options go to the search, e.g. landmarks for ALT
+    Returns: RecordingWriter that the search's events should be fed to
+    """
     print(f"Running {algorithm_name}...")
 
-    # Update neighbors before running algorithm
-    grid.update_all_neighbors()
-
     # Clear any previous path/visited nodes
     grid.clear_path()
 
-    # Run the selected algorithm
-    if algorithm_name == ALGO_BFS:
-        return Pathfinder.bfs(grid, Window,
-                              lambda: draw(Window, grid, algorithm_name, True))
-
-    elif algorithm_name == ALGO_DIJKSTRA:
-        return Pathfinder.dijkstra(grid, Window,
-                                   lambda: draw(Window, grid, algorithm_name, True))
-
-    elif algorithm_name == ALGO_ASTAR:
-        return Pathfinder.a_star(grid, Window,
-                                 lambda: draw(Window, grid, algorithm_name, True))
-
-    elif algorithm_name == ALGO_DFS:
-        return Pathfinder.dfs(grid, Window,
-                              lambda: draw(Window, grid, algorithm_name, True))
+    grid_map = grid.to_map()
+    worker.start(grid_map, algorithm_name, **options)
+    return RecordingWriter(io.BytesIO(), grid_map, algorithm_name)
+
+
+def animate_search(grid, pending_events, max_steps):
+    """
+    Apply queued search events to the grid, at most max_steps expansions
+    Returns: None while the search is still going, otherwise the path
+    (excluding start and end) or "NO_PATH"
+    """
+    steps = 0
+    while pending_events and steps < max_steps:
+        event, value = pending_events.popleft()
+
+        if event == DONE:
+            if value is None:
+                return "NO_PATH"
+            return [grid.node_at(index) for index in value[1:-1]]
+
+        node = grid.node_at(value)
+        if event == EXPAND:
+            node.make_visited()
+            steps += 1
+        elif event == BACKTRACK and not (node.is_start or node.is_end):
+            node.color = (200, 100, 200)  # Purple for backtracking
 
     return None
 
@@ -0,0 +1,135 @@
+import multiprocessing
+import queue
+import time
+from collections import deque, namedtuple
+
+from algorithms import BACKTRACK, DONE, EXPAND, SEARCHES, Pathfinder, SearchScratch
+from grid import CELL_BACKTRACK, CELL_PATH, CELL_VISITED
+
+# Final numbers reported by a race worker; path_cost is None if no path
+# exists and peak_nodes is only reported by the memory-bounded searches
+RaceResult = namedtuple(
+    "RaceResult",
+    ["algorithm_name", "expansions", "path_cost", "wall_time", "peak_nodes"])
+
+
+def _race_worker(algorithm_name, grid_map, results, batch_size, options):
+    """Process entry point: run one search, streaming its events and result"""
+    batch = []
+    expansions = 0
+    path = None
+    send_time = 0.0  # Queue hand-off is not part of the search time
+
+    # The first put starts the queue's feeder thread; do it before timing
+    results.put((algorithm_name, []))
+
+    scratch = SearchScratch(len(grid_map.walls))
+    started = time.perf_counter()
+    for event, value in Pathfinder.iter_search(grid_map, algorithm_name, scratch, **options):
+        if event == EXPAND:
+            expansions += 1
+        elif event == DONE:
+            path = value
+
+        batch.append((event, value))
+        if len(batch) >= batch_size:
+            sent = time.perf_counter()
+            results.put((algorithm_name, batch))
+            send_time += time.perf_counter() - sent
+            batch = []
+    wall_time = time.perf_counter() - started - send_time
+
+    results.put((algorithm_name, batch))
+    path_cost = len(path) - 1 if path else None
+    results.put((algorithm_name, RaceResult(
+        algorithm_name, expansions, path_cost, wall_time, scratch.peak_nodes)))
+
+
+class RaceLane:
+    """Animation state of one algorithm taking part in a race"""
+
+    def __init__(self, algorithm_name, size) -> None:
+        self.algorithm_name = algorithm_name
+        self.cells = bytearray(size)
+        self.pending = deque()
+        self.result = None  # RaceResult once the worker has finished
+        self.finished = False  # True once every event has been animated
+
+    def animate(self, max_steps):
+        """Apply queued events to the lane, at most max_steps expansions"""
+        steps = 0
+        while self.pending and steps < max_steps:
+            event, value = self.pending.popleft()
+
+            if event == EXPAND:
+                self.cells[value] = CELL_VISITED
+                steps += 1
+            elif event == BACKTRACK:
+                self.cells[value] = CELL_BACKTRACK
+            elif event == DONE:
+                for index in value or ():
+                    self.cells[index] = CELL_PATH
+                self.finished = True
+
+
+class RaceRunner:
+    """
+    Runs several algorithms on the same GridMap snapshot, one worker
+    process each, and collects their explorations side by side.
+    options maps an algorithm name to the keyword options for its search.
+    """
+
+    def __init__(self, grid_map, algorithm_names=None, batch_size=256, options=None) -> None:
+        self.grid_map = grid_map
+        self.batch_size = batch_size
+        self.options = options or {}
+        self.lanes = [RaceLane(name, len(grid_map.walls))
+                      for name in (algorithm_names or SEARCHES)]
+        self._lanes_by_name = {lane.algorithm_name: lane for lane in self.lanes}
+        self.results = multiprocessing.Queue()
+        self.processes = []
+
+    def start(self):
+        for lane in self.lanes:
+            process = multiprocessing.Process(
+                target=_race_worker,
+                args=(lane.algorithm_name, self.grid_map, self.results,
+                      self.batch_size, self.options.get(lane.algorithm_name, {})),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def poll(self):
+        """Hand queued worker messages to their lanes"""
+        while True:
+            try:
+                algorithm_name, message = self.results.get_nowait()
+            except queue.Empty:
+                return
+
+            lane = self._lanes_by_name[algorithm_name]
+            if isinstance(message, RaceResult):
+                lane.result = message
+            else:
+                lane.pending.extend(message)
+
+    def animate(self, max_steps):
+        for lane in self.lanes:
+            lane.animate(max_steps)
+
+    @property
+    def done(self):
+        return all(lane.finished and lane.result for lane in self.lanes)
+
+    def stop(self):
+        """Terminate any workers that are still running"""
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    def summary(self):
+        """Results of finished workers, ordered by fewest expansions"""
+        results = [lane.result for lane in self.lanes if lane.result]
+        return sorted(results, key=lambda result: result.expansions)
@@ -0,0 +1,261 @@
+import io
+import os
+import struct
+import zlib
+from collections import deque
+
+from algorithms import BACKTRACK, DONE, EXPAND, PUSH, Pathfinder
+from grid import (CELL_BACKTRACK, CELL_EMPTY, CELL_FRONTIER, CELL_PATH,
+                  CELL_VISITED, GridMap)
+
+# File layout:
+#   header   magic, version, rows, cols, start, goal count, event count,
+#            compressed walls length (start is -1 when unset)
+#   name     algorithm name, one length byte then UTF-8
+#   goals    goal cell indices, 8 bytes each
+#   walls    zlib-compressed GridMap walls
+#   body     one varint per event: zigzag(index - previous index) << 2 | event
+#            DONE is followed by varint(path length + 1), 0 meaning no
+#            path, and then the path as zigzag deltas
+MAGIC = b"PVRC"
+VERSION = 2
+HEADER = struct.Struct("<4sBIIqqQI")
+COUNT_OFFSET = struct.calcsize("<4sBIIqq")  # Event count is patched on close
+
+CHUNK_SIZE = 1 << 16
+
+# Cell state each event leaves behind
+EVENT_STATES = {EXPAND: CELL_VISITED, PUSH: CELL_FRONTIER, BACKTRACK: CELL_BACKTRACK}
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class RecordingWriter:
+    """
+    Appends search events to a binary file object as they happen.
+    The writer does not own the file; close() only flushes and patches
+    the event count into the header.
+    """
+
+    def __init__(self, file, grid_map, algorithm_name) -> None:
+        self.file = file
+        self.event_count = 0
+        self.start = file.tell()
+        self._buffer = bytearray()
+        self._previous = grid_map.start or 0
+
+        name = algorithm_name.encode("utf-8")
+        goals = sorted(grid_map.goals)
+        walls = zlib.compress(bytes(grid_map.walls))
+        file.write(HEADER.pack(
+            MAGIC, VERSION, grid_map.rows, grid_map.cols,
+            -1 if grid_map.start is None else grid_map.start,
+            len(goals), 0, len(walls)))
+        file.write(bytes([len(name)]) + name)
+        file.write(struct.pack(f"<{len(goals)}q", *goals))
+        file.write(walls)
+
+    def add(self, event, value):
+        buffer = self._buffer
+        self.event_count += 1
+
+        if event == DONE:
+            _write_varint(buffer, DONE)
+            if value is None:
+                _write_varint(buffer, 0)
+            else:
+                _write_varint(buffer, len(value) + 1)
+                previous = self._previous
+                for index in value:
+                    _write_varint(buffer, _zigzag(index - previous))
+                    previous = index
+        else:
+            _write_varint(buffer, _zigzag(value - self._previous) << 2 | event)
+            self._previous = value
+
+        if len(buffer) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        end = self.file.tell()
+        self.file.seek(self.start + COUNT_OFFSET)
+        self.file.write(struct.pack("<Q", self.event_count))
+        self.file.seek(end)
+
+
+def record(grid_map, algorithm_name, path):
+    """Run a search headlessly and save its event log to path"""
+    with open(path, "wb") as file:
+        writer = RecordingWriter(file, grid_map, algorithm_name)
+        for event, value in Pathfinder.iter_search(grid_map, algorithm_name):
+            writer.add(event, value)
+        writer.close()
+
+
+class Recording:
+    """
+    Read side of a saved search. Only the header and walls are held in
+    memory; events() streams the body from the file in chunks.
+    """
+
+    def __init__(self, source) -> None:
+        """source is a file path or the bytes of a recording"""
+        self.source = source
+
+        with self._open() as file:
+            fields = HEADER.unpack(file.read(HEADER.size))
+            magic, version, self.rows, self.cols, start, goal_count, \
+                self.event_count, walls_length = fields
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Not a search recording (or unsupported version)")
+
+            self.start = None if start == -1 else start
+            name_length, = struct.unpack("<B", file.read(1))
+            self.algorithm_name = file.read(name_length).decode("utf-8")
+            self.goals = frozenset(struct.unpack(f"<{goal_count}q", file.read(8 * goal_count)))
+            self.walls = bytearray(zlib.decompress(file.read(walls_length)))
+            self.body_offset = file.tell()
+
+    def _open(self):
+        if isinstance(self.source, (bytes, bytearray)):
+            return io.BytesIO(self.source)
+        return open(self.source, "rb")
+
+    def save(self, path):
+        """
+        Write the recording to path. It goes to a temporary file first,
+        so path may be the very file the recording is read from.
+        """
+        temporary = f"{path}.tmp"
+        try:
+            with open(temporary, "wb") as out, self._open() as file:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                    out.write(chunk)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def grid_map(self):
+        return GridMap(self.rows, self.cols, bytearray(self.walls), self.start, self.goals)
+
+    def events(self):
+        """Decode (event, value) pairs lazily, in recording order"""
+        previous = self.start or 0
+        value = shift = 0
+        path = None  # Path being decoded after DONE
+        path_length = -1  # -1 until the length following DONE is read
+
+        with self._open() as file:
+            file.seek(self.body_offset)
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                for byte in chunk:
+                    value |= (byte & 0x7F) << shift
+                    if byte & 0x80:
+                        shift += 7
+                        continue
+
+                    if path is not None:
+                        if path_length == -1:
+                            path_length = value - 1
+                            if path_length == -1:
+                                yield DONE, None
+                                return
+                        else:
+                            previous += _unzigzag(value)
+                            path.append(previous)
+                        if len(path) == path_length:
+                            yield DONE, path
+                            return
+                    elif value == DONE:
+                        path = []
+                    else:
+                        previous += _unzigzag(value >> 2)
+                        yield value & 3, previous
+
+                    value = shift = 0
+
+
+class Replay:
+    """
+    Scrubbable playback of a Recording. cells holds the display state of
+    every cell after `step` events. Recent steps are journaled so stepping
+    backwards is cheap; seeking further back replays the log from the start.
+    """
+
+    def __init__(self, recording, history=1 << 16) -> None:
+        self.recording = recording
+        self.total = recording.event_count
+        self.cells = bytearray(recording.rows * recording.cols)
+        self.step = 0
+        self._events = recording.events()
+        self._journal = deque(maxlen=history)  # (event, value, undo pairs)
+        self._redo = []  # Undone events, replayed before reading further
+
+    def seek(self, step):
+        step = max(0, min(self.total, step))
+
+        if step < self.step - len(self._journal):
+            # Too far back for the journal; rebuild from the beginning
+            self.cells[:] = bytes(len(self.cells))
+            self.step = 0
+            self._events = self.recording.events()
+            self._journal.clear()
+            self._redo.clear()
+
+        while self.step > step:
+            self._undo()
+        while self.step < step:
+            if self._redo:
+                self._apply(*self._redo.pop())
+            else:
+                self._apply(*next(self._events))
+
+    def forward(self, steps=1):
+        self.seek(self.step + steps)
+
+    def back(self, steps=1):
+        self.seek(self.step - steps)
+
+    def _apply(self, event, value):
+        cells = self.cells
+        undo = []
+        if event == DONE:
+            for index in value or ():
+                undo += (index, cells[index])
+                cells[index] = CELL_PATH
+        else:
+            undo += (value, cells[value])
+            # A pushed cell that was already expanded keeps its state
+            if event != PUSH or cells[value] == CELL_EMPTY:
+                cells[value] = EVENT_STATES[event]
+
+        self._journal.append((event, value, undo))
+        self.step += 1
+
+    def _undo(self):
+        event, value, undo = self._journal.pop()
+        for i in range(len(undo) - 2, -1, -2):
+            self.cells[undo[i]] = undo[i + 1]
+
+        self._redo.append((event, value))
+        self.step -= 1
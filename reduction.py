@@ -0,0 +1,515 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import accumulate
+
+from algorithms import DONE, EXPAND, PUSH, Pathfinder
+from grid import GridMap
+
+# Sizes of a reduction. ratio is the share of open cells that are not
+# junctions, i.e. that the reduced graph leaves out.
+ReductionStats = namedtuple(
+    "ReductionStats",
+    ["open_cells", "dead_end_cells", "corridor_cells", "junctions", "edges", "ratio"])
+
+# Walls are compared in chunks of this many cells to find edited cells
+COMPARE_CHUNK = 4096
+
+# update() rebuilds from scratch when more than this share of cells changed
+REBUILD_FRACTION = 1 / 64
+
+# Names of the arrays GridReduction.tables() returns
+TABLES = (
+    "reduction_core",
+    "reduction_degree",
+    "reduction_exit",
+    "reduction_junctions",  # Sorted junction cells
+    "reduction_edge_offsets",  # Per junction, start of its edges
+    "reduction_edges",  # (junction, length, first cell) per edge
+    "reduction_loop_anchors",
+)
+
+
+def _count(table, value, chunk_size=1 << 20):
+    """Entries of a byte table equal to value, without copying it whole"""
+    with memoryview(table) as view:
+        return sum(view[i:i + chunk_size].tobytes().count(value)
+                   for i in range(0, len(view), chunk_size))
+
+
+class _SharedEdges:
+    """
+    Read-only stand-in for GridReduction.edges over flat tables: maps a
+    junction to its list of (junction, length, first cell) edges
+    """
+
+    def __init__(self, junctions, offsets, edges) -> None:
+        self.junctions = junctions
+        self.offsets = offsets
+        self.edges = edges
+
+    def _position(self, junction):
+        position = bisect_left(self.junctions, junction)
+        if position == len(self.junctions) or self.junctions[position] != junction:
+            return None
+        return position
+
+    def __getitem__(self, junction):
+        position = self._position(junction)
+        if position is None:
+            raise KeyError(junction)
+        start, end = self.offsets[position], self.offsets[position + 1]
+        edges = self.edges
+        return [(edges[i], edges[i + 1], edges[i + 2]) for i in range(3 * start, 3 * end, 3)]
+
+    def __contains__(self, junction):
+        return self._position(junction) is not None
+
+    def __len__(self):
+        return len(self.junctions)
+
+    def values(self):
+        return (self[junction] for junction in self.junctions)
+
+
+class GridReduction:
+    """
+    Reduced search graph of a GridMap.
+
+    Dead-end regions are trees hanging off the rest of the map. They are
+    peeled away, leaving the 2-core, and every peeled cell keeps an exit
+    pointer toward the cell it hangs from (-1 at the root of a map part
+    with no loops). Inside the core, corridors of cells with exactly two
+    core neighbors become single weighted edges between junctions.
+
+    A shortest path only enters a dead-end region if the start or a goal
+    lies in it, and then only along that cell's exit chain, so searches
+    settle junctions alone and follow exit chains for their endpoints.
+    """
+
+    def __init__(self, grid_map) -> None:
+        self._build(grid_map)
+
+    @classmethod
+    def attach(cls, grid_map, tables):
+        """
+        Read-only reduction of grid_map over arrays from tables(), such as
+        the views of a SharedGridMap, so processes can share one copy.
+        It searches like the original but cannot be updated.
+        """
+        reduction = cls.__new__(cls)
+        reduction.rows = grid_map.rows
+        reduction.cols = grid_map.cols
+        reduction.walls = grid_map.walls
+        reduction.grid_map = GridMap(grid_map.rows, grid_map.cols, grid_map.walls)
+        reduction.core = tables["reduction_core"]
+        reduction.degree = tables["reduction_degree"]
+        reduction.exit = tables["reduction_exit"]
+        reduction.loop_anchors = frozenset(tables["reduction_loop_anchors"])
+        reduction.edges = _SharedEdges(tables["reduction_junctions"],
+                                       tables["reduction_edge_offsets"],
+                                       tables["reduction_edges"])
+        return reduction
+
+    def tables(self):
+        """The reduction as flat arrays named as in TABLES, for attach()"""
+        # 32-bit entries where every offset (up to 4 edges per cell) fits
+        index_type = "i" if 4 * len(self.walls) < 2 ** 31 else "q"
+        junctions = array(index_type, sorted(self.edges))
+        counts = [0]
+        edges = array(index_type)
+        for junction in junctions:
+            counts.append(len(self.edges[junction]))
+            for edge in self.edges[junction]:
+                edges.extend(edge)
+
+        arrays = (array("B", self.core), array("B", self.degree), self.exit, junctions,
+                  array(index_type, accumulate(counts)), edges,
+                  array(index_type, sorted(self.loop_anchors)))
+        return dict(zip(TABLES, arrays))
+
+    def _build(self, grid_map):
+        self.rows = grid_map.rows
+        self.cols = grid_map.cols
+        self.walls = bytearray(grid_map.walls)
+        self.grid_map = GridMap(self.rows, self.cols, self.walls)
+
+        size = len(self.walls)
+        self.core = bytearray(size)  # 1 for cells in the 2-core
+        self.degree = bytearray(size)  # Core neighbors of each core cell
+        self.exit = array("q", [-1]) * size  # Peeled cell -> cell it hangs from
+        self.loop_anchors = set()  # Junctions chosen on loops without any
+        self.edges = {}  # Junction -> [(junction, length, first cell), ...]
+
+        neighbors = self.grid_map.neighbors
+        to_peel = []
+        for cell in range(size):
+            if not self.walls[cell]:
+                self.core[cell] = 1
+                self.degree[cell] = len(neighbors(cell))
+                if self.degree[cell] < 2:
+                    to_peel.append(cell)
+        self._peel(to_peel, set())
+
+        for cell in range(size):
+            if self._is_junction(cell):
+                self._rebuild_edges(cell)
+        self._anchor_loops()
+
+    def _is_junction(self, cell):
+        return self.core[cell] and (self.degree[cell] != 2 or cell in self.loop_anchors)
+
+    def _core_neighbors(self, cell):
+        return [neighbor for neighbor in self.grid_map.neighbors(cell) if self.core[neighbor]]
+
+    def _peel(self, stack, changed):
+        """Remove core cells with fewer than two core neighbors, repeatedly"""
+        core = self.core
+        degree = self.degree
+        while stack:
+            cell = stack.pop()
+            if not core[cell]:
+                continue
+
+            core[cell] = 0
+            degree[cell] = 0
+            self.loop_anchors.discard(cell)
+            self.exit[cell] = -1
+            changed.add(cell)
+
+            for neighbor in self.grid_map.neighbors(cell):
+                if core[neighbor]:
+                    self.exit[cell] = neighbor  # At most one is left
+                    degree[neighbor] -= 1
+                    changed.add(neighbor)
+                    if degree[neighbor] < 2:
+                        stack.append(neighbor)
+
+    def _walk(self, origin, first):
+        """
+        Follow a corridor from origin through its neighbor first
+        Returns: cells from first to the junction it ends at (inclusive);
+        the last cell is origin itself if the corridor loops back
+        """
+        cells = [first]
+        previous, current = origin, first
+        while current != origin and not self._is_junction(current):
+            for neighbor in self.grid_map.neighbors(current):
+                if self.core[neighbor] and neighbor != previous:
+                    break
+            previous, current = current, neighbor
+            cells.append(current)
+        return cells
+
+    def _rebuild_edges(self, junction):
+        edges = []
+        for first in self._core_neighbors(junction):
+            cells = self._walk(junction, first)
+            if cells[-1] != junction:  # A loop back never shortens a path
+                edges.append((cells[-1], len(cells), first))
+        self.edges[junction] = edges
+
+    def _anchor_loops(self):
+        """Give every loop that has no junction one, so walks always end"""
+        seen = bytearray(len(self.walls))
+        for cell in range(len(self.walls)):
+            if not self.core[cell] or seen[cell] or self._is_junction(cell):
+                continue
+            for first in self._core_neighbors(cell):
+                cells = self._walk(cell, first)
+                for corridor_cell in cells:
+                    seen[corridor_cell] = 1
+                if cells[-1] == cell:
+                    self.loop_anchors.add(cell)
+                    self._rebuild_edges(cell)
+                    break
+
+    def matches(self, grid_map):
+        """True if the reduction is up to date with the map's walls"""
+        if self.walls is grid_map.walls:
+            return True  # Shares the map's walls, as attached reductions do
+        return ((self.rows, self.cols) == (grid_map.rows, grid_map.cols)
+                and self.walls == grid_map.walls)
+
+    def update(self, grid_map):
+        """
+        Bring the reduction up to date with a map whose walls were edited
+        Returns: number of cells that changed
+        """
+        if (self.rows, self.cols) != (grid_map.rows, grid_map.cols):
+            raise ValueError("Map size differs from the reduction's")
+
+        walls = grid_map.walls
+        edited = []
+        for start in range(0, len(self.walls), COMPARE_CHUNK):
+            end = start + COMPARE_CHUNK
+            if self.walls[start:end] != walls[start:end]:
+                edited.extend(cell for cell in range(start, min(end, len(self.walls)))
+                              if self.walls[cell] != walls[cell])
+
+        if len(edited) > len(self.walls) * REBUILD_FRACTION:
+            self._build(grid_map)
+        else:
+            for cell in edited:
+                self.set_wall(cell, bool(walls[cell]))
+        return len(edited)
+
+    def set_wall(self, cell, wall):
+        """Add or remove one wall, updating only what it affects"""
+        if bool(self.walls[cell]) == wall:
+            return
+
+        changed = {cell}
+        if wall:
+            self._close(cell, changed)
+        else:
+            self._open(cell, changed)
+        self._refresh(changed)
+
+    def _close(self, cell, changed):
+        neighbors = self.grid_map.neighbors(cell)
+        self.walls[cell] = 1
+
+        # Trees that hung from the cell are now cut off and root themselves
+        for neighbor in neighbors:
+            if self.exit[neighbor] == cell:
+                self.exit[neighbor] = -1
+
+        self.exit[cell] = -1
+        if self.core[cell]:
+            self.core[cell] = 0
+            self.degree[cell] = 0
+            self.loop_anchors.discard(cell)
+            to_peel = []
+            for neighbor in neighbors:
+                if self.core[neighbor]:
+                    self.degree[neighbor] -= 1
+                    changed.add(neighbor)
+                    if self.degree[neighbor] < 2:
+                        to_peel.append(neighbor)
+            self._peel(to_peel, changed)
+
+    def _open(self, cell, changed):
+        """
+        Only the new cell and the exit chains of its neighbors can join the
+        core. Peel that small graph, with the core cells it reaches pinned,
+        to find which do and how the rest hang.
+        """
+        self.walls[cell] = 0
+        adjacent = {cell: set()}
+        pinned = set()
+
+        def link(a, b):
+            adjacent.setdefault(a, set()).add(b)
+            adjacent.setdefault(b, set()).add(a)
+
+        for neighbor in self.grid_map.neighbors(cell):
+            climbed = neighbor in adjacent
+            link(cell, neighbor)
+            current = neighbor
+            while not climbed:
+                if self.core[current]:
+                    pinned.add(current)
+                    break
+                up = self.exit[current]
+                if up == -1:
+                    break  # Root of a part with no loops
+                climbed = up in adjacent
+                link(current, up)
+                current = up
+
+        remaining = {node: len(links) for node, links in adjacent.items()}
+        stack = [node for node in adjacent if node not in pinned and remaining[node] < 2]
+        peeled = set()
+        while stack:
+            node = stack.pop()
+            if node in peeled:
+                continue
+            peeled.add(node)
+            self.exit[node] = -1
+            for other in adjacent[node]:
+                if other not in peeled:
+                    self.exit[node] = other
+                    if other not in pinned:
+                        remaining[other] -= 1
+                        if remaining[other] < 2:
+                            stack.append(other)
+
+        joined = [node for node in adjacent if node not in pinned and node not in peeled]
+        for node in joined:
+            self.core[node] = 1
+            self.exit[node] = -1
+        for node in joined:
+            for other in [node] + self._core_neighbors(node):
+                self.degree[other] = len(self._core_neighbors(other))
+                changed.add(other)
+
+    def _refresh(self, changed):
+        """Rebuild the edges of every junction whose corridors ran through changed cells"""
+        affected = set()
+        pending = []
+        for cell in changed:
+            if cell in self.edges and not self._is_junction(cell):
+                del self.edges[cell]
+            pending.append(cell)
+            pending.extend(self._core_neighbors(cell))
+
+        examined = set()
+        while pending:
+            near = pending.pop()
+            if not self.core[near] or near in examined:
+                continue
+            examined.add(near)
+
+            if near in self.loop_anchors and self.degree[near] == 2:
+                # Re-anchored below if its loop still has no junction
+                self.loop_anchors.discard(near)
+                self.edges.pop(near, None)
+            if self._is_junction(near):
+                affected.add(near)
+                continue
+
+            for first in self._core_neighbors(near):
+                cells = self._walk(near, first)
+                examined.update(cells[:-1])  # Same corridor, same junctions
+                end = cells[-1]
+                if end == near:
+                    self.loop_anchors.add(near)  # A loop with no junction
+                    affected.add(near)
+                    break
+                affected.add(end)
+                if end in self.loop_anchors and self.degree[end] == 2:
+                    pending.append(end)  # May no longer be needed
+
+        for junction in affected:
+            if self._is_junction(junction):
+                self._rebuild_edges(junction)
+
+    def stats(self):
+        open_cells = _count(self.walls, 0)
+        core_cells = _count(self.core, 1)
+        junctions = len(self.edges)
+        return ReductionStats(
+            open_cells,
+            open_cells - core_cells,
+            core_cells - junctions,
+            junctions,
+            sum(len(edges) for edges in self.edges.values()) // 2,
+            1 - junctions / open_cells if open_cells else 0.0)
+
+    def _exit_chain(self, cell):
+        """Cells from cell up its exit chain to the core (or a root)"""
+        chain = [cell]
+        while not self.core[chain[-1]] and self.exit[chain[-1]] != -1:
+            chain.append(self.exit[chain[-1]])
+        return chain
+
+    def _attachments(self, cell):
+        """
+        Routes from a cell to the junctions nearest it: its exit chain,
+        then the corridor in each direction if the chain ends in one
+        Returns: exit chain, list of cell lists from cell to a junction
+        """
+        chain = self._exit_chain(cell)
+        anchor = chain[-1]
+        if not self.core[anchor]:
+            return chain, []
+        if self._is_junction(anchor):
+            return chain, [chain]
+        return chain, [chain + self._walk(anchor, first)
+                       for first in self._core_neighbors(anchor)]
+
+    def iter_search(self, start, goals):
+        """
+        A* over the junction graph; corridors are never shorter than the
+        Manhattan distance between their ends, so the usual heuristic holds
+        Yields: (EXPAND/PUSH, junction) as junctions are settled and reached,
+        ending with (DONE, full cell path or None)
+        """
+        yield EXPAND, start
+        if start in goals:
+            yield DONE, [start]
+            return
+
+        start_chain, start_routes = self._attachments(start)
+        best_cost = float("inf")
+        best_path = None
+
+        # Cheapest route from each junction to a goal, as cells goal-first
+        goal_routes = {}
+        for goal in goals:
+            goal_chain, routes = self._attachments(goal)
+
+            # Paths that never reach a junction: the two routes meet first
+            for route in [start_chain] + start_routes:
+                positions = {cell: i for i, cell in enumerate(route)}
+                for other in [goal_chain] + routes:
+                    for i, cell in enumerate(other):
+                        if cell in positions:
+                            cost = positions[cell] + i
+                            if cost < best_cost:
+                                best_cost = cost
+                                best_path = route[:positions[cell]] + other[i::-1]
+                            break
+
+            for route in routes:
+                junction = route[-1]
+                if junction not in goal_routes or len(route) < len(goal_routes[junction]):
+                    goal_routes[junction] = route
+
+        heuristic = Pathfinder.goal_heuristic(
+            GridMap(self.rows, self.cols, self.walls, start, goals))
+        distance = {}
+        parent = {}  # Junction -> (previous junction, first cell) or start route
+        heap = []
+        for route in start_routes:
+            junction = route[-1]
+            if len(route) - 1 < distance.get(junction, best_cost):
+                distance[junction] = len(route) - 1
+                parent[junction] = route
+                heapq.heappush(heap, (len(route) - 1 + heuristic(junction), junction))
+
+        best_junction = None
+        while heap:
+            estimate, current = heapq.heappop(heap)
+            current_dist = distance[current]
+            if estimate > current_dist + heuristic(current):
+                continue  # Stale entry
+            if estimate >= best_cost:
+                break
+
+            yield EXPAND, current
+
+            if current in goal_routes:
+                cost = current_dist + len(goal_routes[current]) - 1
+                if cost < best_cost:
+                    best_cost = cost
+                    best_junction = current
+
+            for neighbor, length, first in self.edges[current]:
+                new_dist = current_dist + length
+                if new_dist < distance.get(neighbor, best_cost):
+                    distance[neighbor] = new_dist
+                    parent[neighbor] = (current, first)
+                    heapq.heappush(heap, (new_dist + heuristic(neighbor), neighbor))
+                    yield PUSH, neighbor
+
+        if best_junction is not None:
+            best_path = self._expand(parent, best_junction)
+            best_path += goal_routes[best_junction][-2::-1]
+
+        yield DONE, best_path
+
+    def _expand(self, parent, junction):
+        """Cells from the start to junction, unrolling corridor edges"""
+        pieces = []
+        while isinstance(parent[junction], tuple):
+            previous, first = parent[junction]
+            pieces.append(self._walk(previous, first))
+            junction = previous
+
+        path = list(parent[junction])  # Start route
+        for cells in reversed(pieces):
+            path.extend(cells)
+        return path
@@ -0,0 +1,302 @@
+import math
+
+import pygame
+
+from grid import CELL_BACKTRACK, CELL_EMPTY, CELL_FRONTIER, CELL_PATH, CELL_VISITED
+
+WIDTH, HEIGHT = 600, 700
+
+# Colors
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+BLUE = (0, 120, 255)
+GREY = (200, 200, 200)
+DARK_GREY = (50, 50, 50)
+YELLOW = (255, 255, 0)
+PURPLE = (180, 0, 255)
+ORANGE = (255, 165, 0)
+CYAN = (100, 200, 255)  # For frontier nodes
+
+# Fonts are created by init_window(), once pygame is initialized
+FONT = None
+TITLE_FONT = None
+SMALL_FONT = None
+
+# Replay scrub bar (x, y, width, height) inside the info panel
+SCRUB_BAR = (10, HEIGHT - 120 + 42, WIDTH - 20, 12)
+
+
+def init_window():
+    """Open the window and load the fonts; call after pygame.init()"""
+    global FONT, TITLE_FONT, SMALL_FONT
+
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pathfinding Visualizer")
+
+    FONT = pygame.font.SysFont('arial', 20)
+    TITLE_FONT = pygame.font.SysFont('arial', 24, bold=True)
+    SMALL_FONT = pygame.font.SysFont('arial', 16)
+    return window
+
+
+def draw_node(win, node):
+    pygame.draw.rect(
+        win, node.color, (node.x, node.y, node.size, node.size))
+
+
+def draw_grid(win, grid):
+    for row in grid.grid:
+        for node in row:
+            draw_node(win, node)
+
+    draw_grid_lines(win, grid)
+
+
+def draw_grid_lines(win, grid):
+    color = (220, 220, 220)
+
+    # Horizontal lines
+    for i in range(grid.rows + 1):
+        pygame.draw.line(
+            win, color,
+            (0, i * grid.cell_size),
+            (grid.width, i * grid.cell_size),
+            1
+        )
+
+    # Vertical lines
+    for j in range(grid.cols + 1):
+        pygame.draw.line(
+            win, color,
+            (j * grid.cell_size, 0),
+            (j * grid.cell_size, grid.width),
+            1
+        )
+
+
+def draw_info_panel(win, current_algo, algorithm_running):
+    """Draw information panel at the bottom"""
+    panel_height = 120
+    pygame.draw.rect(win, DARK_GREY, (0, HEIGHT -
+                     panel_height, WIDTH, panel_height))
+
+    # Title
+    title = TITLE_FONT.render("Pathfinding Visualizer", True, ORANGE)
+    win.blit(title, (WIDTH // 2 - title.get_width() //
+             2, HEIGHT - panel_height + 10))
+
+    # Status
+    status_color = YELLOW if algorithm_running else GREEN
+    status_text = f"RUNNING: {current_algo}" if algorithm_running else "READY"
+    status = FONT.render(f"Status: {status_text}", True, status_color)
+    win.blit(status, (10, HEIGHT - panel_height + 40))
+
+    # Instructions
+    instructions = [
+        "Left: Start → End → Walls | Shift+Left: More Ends | Right: Remove",
+        "1-8: Algorithm (1:BFS 2:Dijkstra 3:A* 4:DFS 5:IDA* 6:SMA* 7:ALT 8:Reduced)",
+        "Space: Start | Esc: Cancel | M: Race | G: Generate",
+        "R: Reset | C: Clear | P: Replay | S/L: Save/Load Replay"
+    ]
+
+    for i, text in enumerate(instructions):
+        text_surface = FONT.render(text, True, WHITE)
+        win.blit(text_surface, (10, HEIGHT - panel_height + 60 + i * 20))
+
+    # Legend
+    legend_items = [
+        (GREEN, "Start"),
+        (RED, "End"),
+        (BLACK, "Wall"),
+        (BLUE, "Visited"),
+        (YELLOW, "Path")
+    ]
+
+    for i, (color, label) in enumerate(legend_items):
+        pygame.draw.rect(win, color, (WIDTH - 200, HEIGHT -
+                         panel_height + 65 + i * 25, 20, 20))
+        label_surface = FONT.render(label, True, WHITE)
+        win.blit(label_surface, (WIDTH - 175,
+                 HEIGHT - panel_height + 65 + i * 25))
+
+
+def draw(win, grid, algorithm_name, algorithm_running=False, no_path=False):
+    win.fill(WHITE)
+    grid.draw(win)
+    draw_info_panel(win, algorithm_name, algorithm_running)
+
+    if no_path:
+        show_no_path_message(win, grid)
+
+    # Algorithm status text at top
+    if algorithm_running:
+        # Red when running
+        text = FONT.render(f"Running: {algorithm_name}", True, (255, 0, 0))
+    elif algorithm_name:
+        # Black when selected
+        text = FONT.render(f"Selected: {algorithm_name}", True, (0, 0, 0))
+        win.blit(text, (10, 10))
+
+    pygame.display.update()
+
+
+def draw_replay(win, grid, replay, playing, speed):
+    """Draw the replayed grid with a scrub bar and playback controls"""
+    win.fill(WHITE)
+    grid.draw(win)
+
+    panel_height = 120
+    top = HEIGHT - panel_height
+    pygame.draw.rect(win, DARK_GREY, (0, top, WIDTH, panel_height))
+
+    title = TITLE_FONT.render(
+        f"Replay: {replay.recording.algorithm_name}", True, ORANGE)
+    win.blit(title, (WIDTH // 2 - title.get_width() // 2, top + 8))
+
+    # Scrub bar
+    x, y, width, height = SCRUB_BAR
+    progress = replay.step / replay.total if replay.total else 1
+    pygame.draw.rect(win, GREY, SCRUB_BAR)
+    pygame.draw.rect(win, YELLOW, (x, y, int(width * progress), height))
+
+    state = "Playing" if playing else "Paused"
+    status = FONT.render(
+        f"Step {replay.step}/{replay.total} | Speed x{speed:g} | {state}", True, WHITE)
+    win.blit(status, (10, top + 60))
+
+    controls = SMALL_FONT.render(
+        "Space: Play/Pause | ←/→: Step | ↑/↓: Speed | Home/End | Click bar: Seek | P/Esc: Exit",
+        True, WHITE)
+    win.blit(controls, (10, top + 90))
+
+    pygame.display.update()
+
+
+def sync_replay(grid, replay):
+    """Color grid nodes from the replay's cell states"""
+    replay_colors = {CELL_EMPTY: WHITE, CELL_VISITED: BLUE, CELL_FRONTIER: CYAN,
+                     CELL_BACKTRACK: (200, 100, 200), CELL_PATH: YELLOW}
+
+    for index, state in enumerate(replay.cells):
+        node = grid.node_at(index)
+        if node.is_start or node.is_end or node.is_wall:
+            continue
+
+        if state == CELL_EMPTY:
+            node.is_visited = node.is_path = False
+        elif state == CELL_PATH:
+            node.make_path()
+        else:
+            node.make_visited()
+        node.color = replay_colors[state]
+
+
+def scrub_target(replay, pos):
+    """Replay step under a mouse position on the scrub bar, or None"""
+    x, y, width, height = SCRUB_BAR
+    if not (x <= pos[0] <= x + width and y - 6 <= pos[1] <= y + height + 6):
+        return None
+    return round((pos[0] - x) / width * replay.total)
+
+
+def draw_race(win, grid, race):
+    """Draw every race lane side by side with the summary table below"""
+    win.fill(WHITE)
+
+    lanes = race.lanes
+    grid_map = race.grid_map
+    columns = math.ceil(math.sqrt(len(lanes)))
+    rows = math.ceil(len(lanes) / columns)
+    panel_width = grid.width // columns
+    panel_height = grid.width // rows
+    label_height = 18
+    cell = max(1, min(panel_width // grid_map.cols,
+                      (panel_height - label_height) // grid_map.rows))
+
+    lane_colors = {CELL_VISITED: BLUE,
+                   CELL_BACKTRACK: (200, 100, 200), CELL_PATH: YELLOW}
+
+    for i, lane in enumerate(lanes):
+        x = (i % columns) * panel_width
+        y = (i // columns) * panel_height
+
+        status = "done" if lane.finished else "running"
+        label = SMALL_FONT.render(f"{lane.algorithm_name} ({status})", True, BLACK)
+        win.blit(label, (x + 4, y))
+        y += label_height
+
+        for index, state in enumerate(lane.cells):
+            if index == grid_map.start:
+                color = GREEN
+            elif index in grid_map.goals:
+                color = RED
+            elif grid_map.walls[index]:
+                color = BLACK
+            elif state:
+                color = lane_colors[state]
+            else:
+                continue
+
+            row, col = divmod(index, grid_map.cols)
+            pygame.draw.rect(win, color, (x + col * cell, y + row * cell, cell, cell))
+
+        pygame.draw.rect(win, GREY, (x, y, grid_map.cols * cell, grid_map.rows * cell), 1)
+
+    draw_race_table(win, race)
+    pygame.display.update()
+
+
+def draw_race_table(win, race):
+    """Draw expansions, path cost and wall time of each finished lane"""
+    panel_height = 120
+    top = HEIGHT - panel_height
+    pygame.draw.rect(win, DARK_GREY, (0, top, WIDTH, panel_height))
+
+    line_height = 18
+    rows_per_column = panel_height // line_height - 1
+    results = race.summary()
+    columns = max(1, math.ceil(len(results) / rows_per_column))
+    column_width = WIDTH // columns
+
+    for column in range(columns):
+        x = column * column_width + 10
+        header = SMALL_FONT.render(
+            "Algorithm   Expanded   Cost   Time (ms)", True, ORANGE)
+        win.blit(header, (x, top + 4))
+
+        chunk = results[column * rows_per_column:(column + 1) * rows_per_column]
+        for i, result in enumerate(chunk):
+            cost = "-" if result.path_cost is None else str(result.path_cost)
+            values = (result.algorithm_name, str(result.expansions),
+                      cost, f"{result.wall_time * 1000:.2f}")
+            y = top + 4 + (i + 1) * line_height
+            for value, offset in zip(values, (0, 90, 175, 225)):
+                win.blit(SMALL_FONT.render(value, True, WHITE), (x + offset, y))
+
+    if not race.done:
+        hint = SMALL_FONT.render("Racing...  Esc: Stop", True, YELLOW)
+    else:
+        hint = SMALL_FONT.render("Esc / M: Back to grid", True, GREEN)
+    win.blit(hint, (WIDTH - hint.get_width() - 10, HEIGHT - line_height - 2))
+
+
+def show_no_path_message(win, grid):
+    """Show 'No Path Exists' message on grid"""
+    # Create semi-transparent overlay
+    overlay = pygame.Surface((grid.width, grid.width), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 180))  # Semi-transparent black
+    win.blit(overlay, (0, 0))
+
+    # Display message
+    font = pygame.font.SysFont('arial', 36, bold=True)
+    message = font.render("NO PATH EXISTS!", True, (255, 50, 50))
+    win.blit(message, (grid.width//2 - message.get_width()//2,
+                          grid.width//2 - message.get_height()//2 - 30))
+
+    font2 = pygame.font.SysFont('arial', 24)
+    message2 = font2.render(
+        "Press any key to continue...", True, (255, 255, 255))
+    win.blit(message2, (grid.width//2 - message2.get_width()//2,
+                           grid.width//2 + 20))
@@ -0,0 +1,567 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+
+from algorithms import ALGO_ALT, ALGO_ASTAR, ALGO_REDUCED, DONE, Pathfinder, SearchScratch
+from grid import GridMap
+from landmarks import DEFAULT_COUNT, Landmarks
+from mapgen import generate
+from reduction import GridReduction
+from shared_grid import SharedGridMap
+
+# Protocol: one JSON object per line each way. Requests carry an "op" and
+# an optional "id" that is echoed back; responses have "ok" and either the
+# op's fields or an "error". Cells are [row, col] pairs.
+#   load_map    map, walls (rows of "." open / "#" wall) or generator, rows,
+#               cols, seed; landmarks (count, 0 for none), reduce (bool)
+#   unload_map  map
+#   path        map, start, goals (or goal)  -> path, cost, batch
+#   stats       -> counters and loaded maps
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LINE_LIMIT = 1 << 26  # Longest request or response line, in bytes
+
+BATCH_WINDOW = 0.002  # Seconds a query waits for others with the same goals
+MAX_BATCH = 256  # Queries per batch before it is sent without waiting
+
+LATENCY_WINDOW = 4096  # Latest query latencies kept for percentiles
+THROUGHPUT_WINDOW = 10.0  # Seconds of answered queries behind the rate
+
+MAX_ATTACHED_MAPS = 8  # Maps each worker process keeps attached
+
+# What a worker needs to search a loaded map; small enough to send with
+# every batch. landmark_cells is empty when the map has no landmarks.
+MapHandle = namedtuple("MapHandle", ["info", "landmark_cells", "wall_crc", "reduce"])
+
+
+# Per worker process: shared map name -> (SharedGridMap, SearchScratch,
+# Landmarks or None, GridReduction or None), least recently used first
+_worker_maps = OrderedDict()
+_worker_barrier = None  # Where the tasks of one broadcast meet
+
+
+def _init_worker(barrier):
+    global _worker_barrier
+    _worker_barrier = barrier
+
+
+def _detach(name):
+    """
+    Broadcast task: close this worker's view of a shared map, if it has
+    one. Waiting at the barrier holds the worker until every other one
+    has a task of the broadcast too, so each worker gets exactly one.
+    """
+    state = _worker_maps.pop(name, None)
+    if state is not None:
+        state[0].close()
+    _worker_barrier.wait()
+
+
+def _worker_state(handle):
+    """Attach to a map on first use and keep its preprocessing for later batches"""
+    state = _worker_maps.get(handle.info.name)
+    if state is not None:
+        _worker_maps.move_to_end(handle.info.name)
+        return state
+
+    info = handle.info
+    shared = SharedGridMap.attach(info)
+    landmarks = None
+    if handle.landmark_cells:
+        tables = [shared.tables[f"landmark{i}"] for i in range(len(handle.landmark_cells))]
+        landmarks = Landmarks(info.rows, info.cols, handle.wall_crc,
+                              list(handle.landmark_cells), tables)
+    reduction = None
+    if handle.reduce:
+        reduction = GridReduction.attach(shared.grid_map(), shared.tables)
+
+    state = (shared, SearchScratch(info.rows * info.cols), landmarks, reduction)
+    _worker_maps[info.name] = state
+    if len(_worker_maps) > MAX_ATTACHED_MAPS:
+        _, (oldest, *_) = _worker_maps.popitem(last=False)
+        oldest.close()
+    return state
+
+
+def _run_batch(handle, goals, starts):
+    """
+    Answer every start that shares these goals with one search: A* (on the
+    reduced graph or with landmarks, if the map has them) for a lone start,
+    else one BFS outward from the goals
+    Returns: paths as cell indices, or None, in the order of starts
+    """
+    shared, scratch, landmarks, reduction = _worker_state(handle)
+    grid_map = shared.grid_map(starts[0], goals)
+
+    if len(starts) > 1:
+        paths = Pathfinder.nearest_goal_paths(grid_map, starts, scratch)
+        return [paths[start] for start in starts]
+
+    if reduction is not None:
+        name, options = ALGO_REDUCED, {"reduction": reduction}
+    elif landmarks is not None:
+        name, options = ALGO_ALT, {"landmarks": landmarks}
+    else:
+        name, options = ALGO_ASTAR, {}
+
+    for event, value in Pathfinder.iter_search(grid_map, name, scratch, **options):
+        if event == DONE:
+            return [value]
+
+
+def _build_map(walls, generator, rows, cols, seed, landmark_count, reduce):
+    """
+    The map a load_map request describes, from rows of "."/"#" or a
+    generator, with up to landmark_count landmarks and, if reduce is set,
+    its GridReduction, written straight into a new shared block. The
+    block is left for the server to adopt, so only its small description
+    comes back through the pipe.
+    Returns: SharedMapInfo, landmark cells, wall CRC, open cell count
+    """
+    if walls is not None:
+        grid_map = _parse_walls(walls)
+    else:
+        grid_map = generate(generator, rows, cols, seed=seed)
+
+    landmarks = Landmarks.build(grid_map, landmark_count) if landmark_count else None
+    tables = {f"landmark{i}": table for i, table in enumerate(landmarks.tables if landmarks else ())}
+    if reduce:
+        tables.update(GridReduction(grid_map).tables())
+
+    shared = SharedGridMap.create(grid_map, tables)
+    shared.disown()
+    return (shared.info,
+            tuple(landmarks.cells) if landmarks else (),
+            landmarks.wall_crc if landmarks else 0,
+            grid_map.open_count())
+
+
+# A map the server has loaded
+LoadedMap = namedtuple("LoadedMap", ["shared", "handle"])
+
+
+class QueryCounters:
+    """Latency and throughput of answered path queries"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.batches = 0
+        self.batched_queries = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # Seconds
+        self.answered = deque()  # Answer times within THROUGHPUT_WINDOW
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_queries += size
+
+    def record_query(self, latency):
+        now = time.perf_counter()
+        self.queries += 1
+        self.latencies.append(latency)
+        self.answered.append(now)
+        while self.answered[0] < now - THROUGHPUT_WINDOW:
+            self.answered.popleft()
+
+    def snapshot(self):
+        now = time.perf_counter()
+        while self.answered and self.answered[0] < now - THROUGHPUT_WINDOW:
+            self.answered.popleft()
+
+        latencies = sorted(self.latencies)
+        latency_ms = {}
+        if latencies:
+            latency_ms = {
+                "mean": 1000 * sum(latencies) / len(latencies),
+                "p50": 1000 * latencies[len(latencies) // 2],
+                "p95": 1000 * latencies[min(len(latencies) - 1, len(latencies) * 95 // 100)],
+                "max": 1000 * latencies[-1],
+            }
+
+        uptime = now - self.started
+        return {
+            "uptime": uptime,
+            "queries": self.queries,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch": self.batched_queries / self.batches if self.batches else 0.0,
+            "queries_per_second": len(self.answered) / min(uptime, THROUGHPUT_WINDOW),
+            "latency_ms": latency_ms,
+        }
+
+
+class PathServer:
+    """
+    Local asyncio server answering path queries as JSON lines.
+
+    Loaded maps live in shared memory, together with their landmark
+    tables and reduced graph, and searches run in a process pool whose workers attach to
+    each map once. Queries for the same map and goals that arrive within
+    batch_window seconds are answered by a single search.
+    """
+
+    def __init__(self, processes=None, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH) -> None:
+        # Workers must share this process's resource tracker; one of their
+        # own would free the shared maps when the worker exits
+        resource_tracker.ensure_running()
+        self.processes = processes or os.cpu_count()
+        self.executor = ProcessPoolExecutor(
+            self.processes, initializer=_init_worker,
+            initargs=(multiprocessing.Barrier(self.processes),))
+        self.broadcasting = asyncio.Lock()  # Interleaved broadcasts would deadlock
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.maps = {}  # Name -> LoadedMap
+        self.pending = {}  # (map name, goals) -> [(start, future), ...]
+        self.counters = QueryCounters()
+        self.server = None
+        self.clients = {}  # Connection handler task -> its writer
+        self.ops = {
+            "load_map": self._load_map,
+            "unload_map": self._unload_map,
+            "path": self._path,
+            "stats": self._stats,
+        }
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Listen on a TCP port, or on a Unix socket if path is given"""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(
+                self._serve_client, path, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(
+                self._serve_client, host, port, limit=LINE_LIMIT)
+
+        # Start every worker now: a pool that spawns them on demand could
+        # otherwise have fewer than a broadcast needs
+        await self._broadcast(None)
+        return self.server
+
+    async def close(self):
+        """Stop listening, shut the workers down and free the maps"""
+        if self.server is not None:
+            self.server.close()
+            for writer in self.clients.values():
+                writer.close()  # Handlers see end of input and finish
+            await asyncio.gather(*self.clients, return_exceptions=True)
+            await self.server.wait_closed()
+        self.executor.shutdown()
+        for loaded in self.maps.values():
+            loaded.shared.close()
+        self.maps = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _serve_client(self, reader, writer):
+        # Each line is answered in its own task, so one connection can
+        # have many queries in flight and they can share batches
+        tasks = set()
+        self.clients[asyncio.current_task()] = writer
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            del self.clients[asyncio.current_task()]
+            writer.close()
+
+    async def _answer(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get("id")
+            op = self.ops.get(request.get("op"))
+            if op is None:
+                raise ValueError(f"Unknown op {request.get('op')!r}")
+            response = {"id": request_id, "ok": True, **await op(request)}
+        except Exception as error:  # Reported to the client, never fatal
+            self.counters.errors += 1
+            response = {"id": request_id, "ok": False, "error": str(error) or type(error).__name__}
+
+        writer.write(json.dumps(response).encode("utf-8") + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass  # Client went away
+
+    async def _load_map(self, request):
+        name = _field(request, "map", str)
+        if "walls" in request:
+            source = (_field(request, "walls", list), None, None, None, None)
+        else:
+            source = (None, _field(request, "generator", str), _field(request, "rows", int),
+                      _field(request, "cols", int), request.get("seed"))
+        count = request.get("landmarks", DEFAULT_COUNT)
+        reduce = bool(request.get("reduce", False))
+
+        # Building a large map takes seconds, so it runs in a worker, which
+        # also fills the shared block; the server then owns and frees it
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        info, landmark_cells, wall_crc, open_cells = await loop.run_in_executor(
+            self.executor, _build_map, *source, count, reduce)
+        shared = SharedGridMap.adopt(info)
+        handle = MapHandle(info, landmark_cells, wall_crc, reduce)
+
+        previous = self.maps.get(name)
+        self.maps[name] = LoadedMap(shared, handle)
+        if previous is not None:
+            await self._release(previous.shared)
+
+        return {
+            "map": name,
+            "rows": info.rows,
+            "cols": info.cols,
+            "open_cells": open_cells,
+            "landmarks": len(handle.landmark_cells),
+            "ms": (time.perf_counter() - started) * 1000,
+        }
+
+    async def _unload_map(self, request):
+        name = _field(request, "map", str)
+        loaded = self.maps.pop(name, None)
+        if loaded is None:
+            raise ValueError(f"Unknown map {name!r}")
+        await self._release(loaded.shared)
+        return {"map": name}
+
+    async def _release(self, shared):
+        """Free a map's block once no worker has it attached"""
+        try:
+            await self._broadcast(shared.info.name)
+        finally:
+            shared.close()
+
+    async def _broadcast(self, name):
+        """Run _detach(name) once in every worker"""
+        loop = asyncio.get_running_loop()
+        async with self.broadcasting:
+            await asyncio.gather(*[loop.run_in_executor(self.executor, _detach, name)
+                                   for _ in range(self.processes)])
+
+    async def _path(self, request):
+        received = time.perf_counter()
+        name = _field(request, "map", str)
+        loaded = self.maps.get(name)
+        if loaded is None:
+            raise ValueError(f"Unknown map {name!r}")
+
+        grid_map = loaded.shared.grid_map()
+        start = _open_cell(grid_map, _field(request, "start", list))
+        cells = request["goals"] if "goals" in request else [_field(request, "goal", list)]
+        goals = frozenset(_open_cell(grid_map, cell) for cell in cells)
+        if not goals:
+            raise ValueError("No goals given")
+
+        path, batch_size = await self._enqueue(name, goals, start)
+        self.counters.record_query(time.perf_counter() - received)
+        return {
+            "path": None if path is None else [grid_map.get_pos(index) for index in path],
+            "cost": None if path is None else len(path) - 1,
+            "batch": batch_size,
+        }
+
+    async def _stats(self, request):
+        return {**self.counters.snapshot(), "maps": sorted(self.maps)}
+
+    def _enqueue(self, name, goals, start):
+        """Add a query to the open batch for its map and goals; returns a future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (name, goals)
+
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = []
+            loop.call_later(self.batch_window, self._flush, key, batch)
+        batch.append((start, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key, batch)
+        return future
+
+    def _flush(self, key, batch):
+        if self.pending.get(key) is batch:
+            del self.pending[key]
+            asyncio.create_task(self._run(key, batch))
+
+    async def _run(self, key, batch):
+        name, goals = key
+        starts = list(dict.fromkeys(start for start, _ in batch))
+        try:
+            loaded = self.maps.get(name)
+            if loaded is None:
+                raise ValueError(f"Map {name!r} was unloaded")
+            paths = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _run_batch, loaded.handle, goals, starts)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.counters.record_batch(len(batch))
+        by_start = dict(zip(starts, paths))
+        for start, future in batch:
+            if not future.done():  # Cancelled if its client disconnected
+                future.set_result((by_start[start], len(batch)))
+
+
+def _field(request, name, kind):
+    value = request.get(name)
+    # JSON true/false decode to bool, which is an int subclass
+    if not isinstance(value, kind) or (isinstance(value, bool) and kind is not bool):
+        raise ValueError(f"Field {name!r} must be a {kind.__name__}")
+    return value
+
+
+def _parse_walls(lines):
+    """GridMap from rows of "." (open) and "#" (wall)"""
+    if not lines or not all(isinstance(line, str) for line in lines):
+        raise ValueError("walls must be a non-empty list of strings")
+    cols = len(lines[0])
+    if not cols or any(len(line) != cols for line in lines):
+        raise ValueError("walls rows must all have the same, non-zero length")
+
+    text = "".join(lines).encode("ascii", "replace")
+    if text.translate(None, b".#"):
+        raise ValueError('walls may only contain "." and "#"')
+    return GridMap(len(lines), cols, bytearray(text.translate(bytes.maketrans(b".#", b"\x00\x01"))))
+
+
+def _open_cell(grid_map, cell):
+    """Cell index of a [row, col] pair, which must be open"""
+    if (len(cell) != 2 or not all(type(value) is int for value in cell)
+            or not (0 <= cell[0] < grid_map.rows and 0 <= cell[1] < grid_map.cols)):
+        raise ValueError(f"Cell {cell!r} is not on the map")
+    index = grid_map.index(*cell)
+    if grid_map.walls[index]:
+        raise ValueError(f"Cell {cell!r} is a wall")
+    return index
+
+
+class PathClient:
+    """
+    asyncio client for a PathServer. Requests can overlap: each carries an
+    id, and a background task hands every response to the request that
+    is waiting for it. Failed requests raise ValueError.
+    """
+
+    def __init__(self, reader, writer) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}  # Request id -> future of its response
+        self._responses = asyncio.create_task(self._read_responses())
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Connect over TCP, or to a Unix socket if path is given"""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """Send one request and wait for its response fields"""
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+
+        self.writer.write(json.dumps({"id": request_id, "op": op, **fields}).encode("utf-8") + b"\n")
+        await self.writer.drain()
+
+        response = await future
+        if not response.pop("ok"):
+            raise ValueError(response["error"])
+        del response["id"]
+        return response
+
+    async def load_map(self, name, walls=None, generator=None, rows=None, cols=None,
+                       seed=None, landmarks=DEFAULT_COUNT, reduce=False):
+        """Load a map from rows of "."/"#" or from a generator"""
+        fields = {"map": name, "landmarks": landmarks, "reduce": reduce}
+        if walls is not None:
+            fields["walls"] = list(walls)
+        else:
+            fields.update(generator=generator, rows=rows, cols=cols, seed=seed)
+        return await self.request("load_map", **fields)
+
+    async def unload_map(self, name):
+        return await self.request("unload_map", map=name)
+
+    async def path(self, name, start, goals):
+        """Shortest path as (row, col) tuples from start to the nearest goal, or None"""
+        response = await self.request(
+            "path", map=name, start=list(start), goals=[list(goal) for goal in goals])
+        if response["path"] is None:
+            return None
+        return [tuple(cell) for cell in response["path"]]
+
+    async def stats(self):
+        return await self.request("stats")
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self._responses
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _read_responses(self):
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self.waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except ConnectionError:
+            pass
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Server closed the connection"))
+            self.waiting.clear()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, processes=None):
+    async with PathServer(processes) as server:
+        await server.start(host, port, path)
+        print(f"Serving path queries on {path or f'{host}:{port}'}")
+        await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve path queries as JSON lines")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead")
+    parser.add_argument("--processes", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.processes))
+    except KeyboardInterrupt:
+        pass
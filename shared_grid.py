@@ -0,0 +1,165 @@
+import multiprocessing
+from array import array
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+from algorithms import ALGO_ASTAR, DONE, EXPAND, Pathfinder, SearchScratch
+from grid import GridMap
+
+# Everything needed to attach to a shared map; small enough to send with
+# every task. tables holds (name, typecode, offset, length) per table.
+SharedMapInfo = namedtuple("SharedMapInfo", ["name", "rows", "cols", "tables"])
+
+# Answer to one query; path is None if no path exists
+QueryResult = namedtuple("QueryResult", ["path", "expansions", "peak_nodes"])
+
+
+class SharedGridMap:
+    """
+    Walls of a map, plus optional precomputed tables, in one shared
+    memory block. The creating process owns the block; other
+    processes attach to it through `info` and get read-only views, so a
+    map of any size is stored once however many workers search it.
+    """
+
+    def __init__(self, shm, info, owner) -> None:
+        self.shm = shm
+        self.info = info
+        self.owner = owner
+
+        view = memoryview(shm.buf) if owner else shm.buf.toreadonly()
+        size = info.rows * info.cols
+        self.walls = view[:size]
+        self.tables = {
+            name: view[offset:offset + length * array(typecode).itemsize].cast(typecode)
+            for name, typecode, offset, length in info.tables
+        }
+        self._view = view
+
+    @classmethod
+    def create(cls, grid_map, tables=None):
+        """
+        Copy a GridMap's walls and any tables (name -> array, e.g. a
+        distance table with one entry per cell) into a new shared memory block
+        """
+        size = len(grid_map.walls)
+        layout = []
+        offset = size
+        for name, table in (tables or {}).items():
+            offset += -offset % table.itemsize  # Align for cast()
+            layout.append((name, table.typecode, offset, len(table)))
+            offset += table.itemsize * len(table)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        shm.buf[:size] = grid_map.walls
+        for (_, _, start, _), table in zip(layout, (tables or {}).values()):
+            with memoryview(table) as source:
+                shm.buf[start:start + source.nbytes] = source.cast("B")
+
+        info = SharedMapInfo(shm.name, grid_map.rows, grid_map.cols, tuple(layout))
+        return cls(shm, info, owner=True)
+
+    @classmethod
+    def attach(cls, info):
+        """Open a map created by another process, read-only"""
+        return cls(shared_memory.SharedMemory(name=info.name), info, owner=False)
+
+    @classmethod
+    def adopt(cls, info):
+        """
+        Take ownership of a block another process created and disowned,
+        so that closing it here frees the block
+        """
+        return cls(shared_memory.SharedMemory(name=info.name), info, owner=True)
+
+    def disown(self):
+        """Close this process's handle but leave the block for adopt()"""
+        self.owner = False
+        self.close()
+
+    def grid_map(self, start=None, goals=()):
+        """GridMap over the shared walls (no copy) for one query"""
+        return GridMap(self.info.rows, self.info.cols, self.walls, start, goals)
+
+    def close(self):
+        """Release the views; the owner also frees the block"""
+        for table in self.tables.values():
+            table.release()
+        self.walls.release()
+        self._view.release()
+        self.tables = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Per worker process: the attached map and the scratch its searches reuse
+_worker_map = None
+_worker_scratch = None
+
+
+def _attach_worker(info):
+    """Pool initializer: attach to the shared map once per process"""
+    global _worker_map, _worker_scratch
+    _worker_map = SharedGridMap.attach(info)
+    _worker_scratch = SearchScratch(info.rows * info.cols)
+
+
+def _run_query(start, goals, algorithm_name, options):
+    grid_map = _worker_map.grid_map(start, goals)
+    expansions = 0
+    path = None
+
+    for event, value in Pathfinder.iter_search(
+            grid_map, algorithm_name, _worker_scratch, **options):
+        if event == EXPAND:
+            expansions += 1
+        elif event == DONE:
+            path = value
+
+    return QueryResult(path, expansions, _worker_scratch.peak_nodes)
+
+
+class SharedSearchPool:
+    """
+    Worker processes answering path queries on one SharedGridMap.
+    A query ships only its start, goals and options; each worker keeps
+    its own SearchScratch between queries.
+    """
+
+    def __init__(self, shared_map, processes=None) -> None:
+        self.shared_map = shared_map
+        self.pool = multiprocessing.Pool(
+            processes, initializer=_attach_worker, initargs=(shared_map.info,))
+
+    def submit(self, start, goals, algorithm_name=ALGO_ASTAR, **options):
+        """Queue a query; returns an AsyncResult whose get() is a QueryResult"""
+        return self.pool.apply_async(
+            _run_query, (start, frozenset(goals), algorithm_name, options))
+
+    def search(self, start, goals, algorithm_name=ALGO_ASTAR, **options):
+        """Run one query and wait for its QueryResult"""
+        return self.submit(start, goals, algorithm_name, **options).get()
+
+    def search_many(self, queries, algorithm_name=ALGO_ASTAR, **options):
+        """QueryResults for (start, goals) pairs, in order, spread over the workers"""
+        pending = [self.submit(start, goals, algorithm_name, **options)
+                   for start, goals in queries]
+        return [result.get() for result in pending]
+
+    def close(self):
+        """Finish queued queries and stop the workers"""
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from algorithms import DONE, Pathfinder, SearchScratch
+from grid import GridMap
+from mapgen import generate
+
+
+def search(grid_map, name, **options):
+    """Run a search to completion; returns (path, peak_nodes)"""
+    scratch = SearchScratch(len(grid_map.walls))
+    path = None
+    for event, value in Pathfinder.iter_search(grid_map, name, scratch, **options):
+        if event == DONE:
+            path = value
+    return path, scratch.peak_nodes
+
+
+def path_cost(path):
+    return None if path is None else len(path) - 1
+
+
+def assert_valid(grid_map, path):
+    assert path[0] == grid_map.start
+    assert path[-1] in grid_map.goals
+    for cell, step in zip(path, path[1:]):
+        assert step in grid_map.neighbors(cell)
+
+
+def random_query(rng, trial):
+    """A small generated map with a random start and one to three goals"""
+    rows, cols = rng.randint(3, 12), rng.randint(3, 12)
+    name = rng.choice(["Random", "Caves", "Backtracker", "Division"])
+    grid_map = generate(name, rows, cols, seed=trial)
+    open_cells = [i for i in range(rows * cols) if not grid_map.walls[i]]
+    if not open_cells:
+        return None
+    grid_map.start = rng.choice(open_cells)
+    grid_map.goals = frozenset(rng.sample(open_cells, min(len(open_cells), rng.randint(1, 3))))
+    return grid_map
+
+
+def test_sma_star_matches_bfs_across_caps():
+    rng = random.Random(5)
+    for trial in range(600):
+        grid_map = random_query(rng, trial)
+        if grid_map is None:
+            continue
+        shortest = path_cost(search(grid_map, "BFS")[0])
+        if shortest is None or rng.random() < 0.25:
+            max_nodes = rng.randint(1, 40)
+        else:
+            # Caps just above the path length force the most forgetting
+            max_nodes = shortest + rng.randint(1, 4)
+
+        path, peak = search(grid_map, "SMA*", max_nodes=max_nodes)
+        assert peak <= max_nodes
+        if shortest is not None and shortest + 1 <= max_nodes:
+            # The whole shortest path fits, so SMA* must find one
+            assert path_cost(path) == shortest, (trial, max_nodes)
+        if path is not None:
+            assert_valid(grid_map, path)
+            assert path_cost(path) == shortest, (trial, max_nodes)
+
+
+def test_sma_star_tight_cap_on_large_map():
+    grid_map = generate("Random", 100, 100, seed=1)
+    open_cells = [i for i in range(100 * 100) if not grid_map.walls[i]]
+    grid_map.start, grid_map.goals = open_cells[0], frozenset([open_cells[-1]])
+
+    path, peak = search(grid_map, "SMA*", max_nodes=300)
+    assert peak <= 300
+    assert_valid(grid_map, path)
+    assert path_cost(path) == path_cost(search(grid_map, "BFS")[0])
+
+
+@pytest.mark.parametrize("options", [{}, {"table_size": 0}, {"table_size": 16}])
+def test_ida_star_matches_bfs(options):
+    rng = random.Random(7)
+    for trial in range(200):
+        grid_map = random_query(rng, trial)
+        if grid_map is None:
+            continue
+        path = search(grid_map, "IDA*", **options)[0]
+        if path is not None:
+            assert_valid(grid_map, path)
+        assert path_cost(path) == path_cost(search(grid_map, "BFS")[0]), trial
+
+
+def test_many_goal_heuristic_is_manhattan_to_nearest():
+    rng = random.Random(3)
+    for _ in range(100):
+        rows, cols = rng.randint(1, 30), rng.randint(1, 30)
+        grid_map = generate("Random", rows, cols, seed=0)
+        grid_map.goals = frozenset(rng.sample(range(rows * cols), min(rows * cols, rng.randint(17, 60))))
+        heuristic = Pathfinder.goal_heuristic(grid_map)
+        for index in range(rows * cols):
+            row, col = divmod(index, cols)
+            assert heuristic(index) == min(abs(row - goal // cols) + abs(col - goal % cols)
+                                           for goal in grid_map.goals)
+
+
+def events_until_done(grid_map, name, limit, **options):
+    """Events a search yields before DONE; fails past limit"""
+    for count, (event, value) in enumerate(Pathfinder.iter_search(grid_map, name, **options), 1):
+        assert count <= limit, f"{name} still searching after {limit} events"
+        if event == DONE:
+            return count, value
+
+
+def boxed_goal(size):
+    """Empty size x size map whose goal corner is walled off"""
+    grid_map = GridMap(size, size, bytearray(size * size), 0, [size * size - 1])
+    grid_map.walls[size * size - 2] = grid_map.walls[size * size - 1 - size] = 1
+    return grid_map
+
+
+def test_unreachable_goal_ends_quickly():
+    assert events_until_done(boxed_goal(20), "IDA*", 20000)[1] is None
+    assert events_until_done(boxed_goal(8), "SMA*", 1000, max_nodes=25)[1] is None
+
+
+def test_unreachable_goals_across_random_maps():
+    rng = random.Random(11)
+    checked = 0
+    for trial in range(1200):
+        grid_map = random_query(rng, trial)
+        if grid_map is None or search(grid_map, "BFS")[0] is not None:
+            continue
+        checked += 1
+        assert events_until_done(grid_map, "IDA*", 200000)[1] is None, trial
+        max_nodes = rng.randint(1, 40)
+        assert events_until_done(grid_map, "SMA*", 200000, max_nodes=max_nodes)[1] is None, trial
+    assert checked > 20
@@ -0,0 +1,50 @@
+import zlib
+
+import landmarks as landmarks_module
+from algorithms import DONE, Pathfinder
+from landmarks import Landmarks
+from mapgen import generate
+from shared_grid import SharedGridMap
+
+
+def path_cost(grid_map, name, **options):
+    for event, value in Pathfinder.iter_search(grid_map, name, **options):
+        if event == DONE:
+            return None if value is None else len(value) - 1
+
+
+def test_shared_walls_are_checked_once(monkeypatch):
+    grid_map = generate("Caves", 60, 60, seed=5)
+    landmarks = Landmarks.build(grid_map, 4)
+    tables = {f"landmark{i}": table for i, table in enumerate(landmarks.tables)}
+
+    checksums = []
+    crc32 = zlib.crc32
+
+    def counting_crc32(data):
+        checksums.append(len(data))
+        return crc32(data)
+
+    with SharedGridMap.create(grid_map, tables) as shared:
+        attached = SharedGridMap.attach(shared.info)
+        views = [attached.tables[f"landmark{i}"] for i in range(len(landmarks.cells))]
+        shared_landmarks = Landmarks(60, 60, landmarks.wall_crc, landmarks.cells, views)
+        monkeypatch.setattr(landmarks_module.zlib, "crc32", counting_crc32)
+
+        start, goal = grid_map.start, grid_map.end
+        for _ in range(3):
+            query = attached.grid_map(start, [goal])
+            assert (path_cost(query, "ALT", landmarks=shared_landmarks)
+                    == path_cost(query, "BFS"))
+        assert len(checksums) == 1
+        del query, views, shared_landmarks
+        attached.close()
+
+
+def test_edited_walls_are_still_detected():
+    grid_map = generate("Random", 30, 30, seed=1)
+    landmarks = Landmarks.build(grid_map, 3)
+    assert landmarks.matches(grid_map)
+
+    grid_map.walls[grid_map.walls.find(0)] = 1  # Edited in place
+    assert not landmarks.matches(grid_map)
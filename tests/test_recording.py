@@ -0,0 +1,84 @@
+import io
+import random
+import struct
+
+import pytest
+
+from algorithms import DONE, Pathfinder
+from mapgen import generate
+from recording import Recording, RecordingWriter, Replay, record
+
+
+def recorded_map():
+    grid_map = generate("Caves", 30, 40, seed=2)
+    open_cells = [i for i in range(len(grid_map.walls)) if not grid_map.walls[i]]
+    grid_map.start = open_cells[0]
+    grid_map.goals = frozenset(open_cells[-3:])
+    return grid_map
+
+
+def test_save_load_round_trip(tmp_path):
+    grid_map = recorded_map()
+    path = tmp_path / "search.pvrec"
+    record(grid_map, "A*", path)
+
+    recording = Recording(path)
+    assert recording.algorithm_name == "A*"
+    assert (recording.rows, recording.cols) == (30, 40)
+    assert recording.start == grid_map.start
+    assert recording.goals == grid_map.goals
+    assert recording.walls == grid_map.walls
+
+    events = list(Pathfinder.iter_search(grid_map, "A*"))
+    assert list(recording.events()) == events
+    assert recording.event_count == len(events)
+    assert events[-1][0] == DONE
+
+    # Saving over the file it was loaded from keeps it intact
+    data = path.read_bytes()
+    recording.save(path)
+    assert path.read_bytes() == data
+    assert list(Recording(path).events()) == events
+
+    copy = tmp_path / "copy.pvrec"
+    Recording(data).save(copy)
+    assert copy.read_bytes() == data
+
+
+def test_bad_files_raise(tmp_path):
+    path = tmp_path / "bad.pvrec"
+    for data in [b"", b"PVRC", b"not a recording at all, just some text"]:
+        path.write_bytes(data)
+        with pytest.raises((ValueError, struct.error)):
+            Recording(path)
+
+
+def test_replay_seek_matches_fresh_playback():
+    grid_map = recorded_map()
+    buffer = io.BytesIO()
+    writer = RecordingWriter(buffer, grid_map, "BFS")
+    for event, value in Pathfinder.iter_search(grid_map, "BFS"):
+        writer.add(event, value)
+    writer.close()
+    recording = Recording(buffer.getvalue())
+
+    def cells_at(step):
+        fresh = Replay(recording)
+        fresh.forward(step)
+        return bytes(fresh.cells)
+
+    # A short journal forces far seeks back to replay from the start
+    replay = Replay(recording, history=8)
+    rng = random.Random(4)
+    for step in [recording.event_count, 0, recording.event_count + 5, -3]:
+        replay.seek(step)
+        clamped = max(0, min(recording.event_count, step))
+        assert replay.step == clamped
+        assert bytes(replay.cells) == cells_at(clamped)
+
+    for _ in range(40):
+        step = rng.randrange(recording.event_count + 1)
+        replay.seek(step)
+        assert bytes(replay.cells) == cells_at(step)
+        replay.back(rng.randrange(1, 12))
+        assert bytes(replay.cells) == cells_at(replay.step)
@@ -0,0 +1,32 @@
+import random
+
+from algorithms import DONE, Pathfinder
+from mapgen import generate
+from reduction import GridReduction
+from shared_grid import SharedGridMap
+
+
+def path_cost(grid_map, name, **options):
+    for event, value in Pathfinder.iter_search(grid_map, name, **options):
+        if event == DONE:
+            return None if value is None else len(value) - 1
+
+
+def test_attached_reduction_matches_bfs():
+    rng = random.Random(1)
+    for trial in range(100):
+        rows, cols = rng.randint(2, 25), rng.randint(2, 25)
+        grid_map = generate(rng.choice(["Random", "Caves", "Backtracker", "Division"]),
+                            rows, cols, seed=trial)
+        open_cells = [i for i in range(rows * cols) if not grid_map.walls[i]]
+        if len(open_cells) < 2:
+            continue
+        reduction = GridReduction(grid_map)
+
+        with SharedGridMap.create(grid_map, reduction.tables()) as shared:
+            attached = GridReduction.attach(shared.grid_map(), shared.tables)
+            assert attached.stats() == reduction.stats()
+            for _ in range(5):
+                query = shared.grid_map(rng.choice(open_cells), rng.sample(open_cells, 2))
+                assert (path_cost(query, "Reduced", reduction=attached)
+                        == path_cost(query, "BFS"))
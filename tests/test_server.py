@@ -0,0 +1,152 @@
+import asyncio
+import os
+import random
+import unittest
+
+from algorithms import DONE, Pathfinder
+from mapgen import generate
+from server import PathClient, PathServer
+
+WALLS = [
+    "..#.",
+    "..#.",
+    "....",
+]
+
+
+def bfs_cost(grid_map, start, goals):
+    grid_map.start = grid_map.index(*start)
+    grid_map.goals = frozenset(grid_map.index(*goal) for goal in goals)
+    for event, value in Pathfinder.iter_search(grid_map, "BFS"):
+        if event == DONE:
+            return None if value is None else len(value) - 1
+
+
+def open_cells(grid_map):
+    return [grid_map.get_pos(i) for i in range(len(grid_map.walls)) if not grid_map.walls[i]]
+
+
+class PathServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # A wide batch window so concurrent queries reliably share a batch
+        self.server = PathServer(processes=2, batch_window=0.05)
+        await self.server.start(port=0)
+        port = self.server.server.sockets[0].getsockname()[1]
+        self.client = await PathClient.connect(port=port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    def assert_valid(self, grid_map, path, start, goals):
+        self.assertEqual(path[0], tuple(start))
+        self.assertIn(path[-1], [tuple(goal) for goal in goals])
+        for (row, col), (next_row, next_col) in zip(path, path[1:]):
+            self.assertEqual(abs(row - next_row) + abs(col - next_col), 1)
+            self.assertFalse(grid_map.walls[grid_map.index(next_row, next_col)])
+
+    async def test_load_map_from_walls(self):
+        response = await self.client.load_map("tiny", walls=WALLS, landmarks=2)
+        self.assertEqual((response["rows"], response["cols"]), (3, 4))
+        self.assertEqual(response["open_cells"], 10)
+        self.assertEqual(response["landmarks"], 2)
+
+        path = await self.client.path("tiny", (0, 0), [(0, 3)])
+        self.assertEqual(len(path) - 1, 7)
+
+    async def test_paths_match_bfs(self):
+        grid_map = generate("Caves", 60, 60, seed=3)
+        cells = open_cells(grid_map)
+        rng = random.Random(0)
+        for reduce in (False, True):
+            await self.client.load_map("caves", generator="Caves", rows=60, cols=60,
+                                       seed=3, reduce=reduce)
+            for _ in range(20):
+                start, goals = rng.choice(cells), rng.sample(cells, rng.randint(1, 3))
+                path = await self.client.path("caves", start, goals)
+                expected = bfs_cost(grid_map, start, goals)
+                if expected is None:
+                    self.assertIsNone(path)
+                else:
+                    self.assert_valid(grid_map, path, start, goals)
+                    self.assertEqual(len(path) - 1, expected)
+
+    async def test_concurrent_queries_share_a_batch(self):
+        grid_map = generate("Random", 40, 40, seed=1)
+        cells = open_cells(grid_map)
+        await self.client.load_map("random", generator="Random", rows=40, cols=40, seed=1)
+
+        goals = cells[-2:]
+        starts = random.Random(1).sample(cells, 30)
+        responses = await asyncio.gather(*[
+            self.client.request("path", map="random", start=list(start),
+                                goals=[list(goal) for goal in goals])
+            for start in starts])
+
+        self.assertTrue(all(response["batch"] > 1 for response in responses))
+        for start, response in zip(starts, responses):
+            self.assertEqual(response["cost"], bfs_cost(grid_map, start, goals))
+
+        stats = await self.client.stats()
+        self.assertEqual(stats["queries"], 30)
+        self.assertLess(stats["batches"], 30)
+        self.assertGreater(stats["mean_batch"], 1)
+
+    async def test_error_responses(self):
+        await self.client.load_map("tiny", walls=WALLS)
+        bad_requests = [
+            ("path", {"map": "missing", "start": [0, 0], "goals": [[0, 1]]}),
+            ("path", {"map": "tiny", "start": [0, 2], "goals": [[0, 1]]}),  # Wall
+            ("path", {"map": "tiny", "start": [9, 9], "goals": [[0, 1]]}),  # Off the map
+            ("path", {"map": "tiny", "start": [0, 0], "goals": []}),
+            ("path", {"map": "tiny", "start": [True, False], "goals": [[0, 1]]}),
+            ("load_map", {"map": "bad", "generator": "Random", "rows": True, "cols": 5}),
+            ("load_map", {"map": "bad", "walls": ["..", "."]}),
+            ("load_map", {"map": "bad", "walls": [".x"]}),
+            ("load_map", {"map": "bad", "generator": "Nope", "rows": 5, "cols": 5}),
+            ("unload_map", {"map": "missing"}),
+            ("bogus", {}),
+        ]
+        for op, fields in bad_requests:
+            with self.assertRaises(ValueError):
+                await self.client.request(op, **fields)
+
+        # Errors never take the connection down
+        self.assertEqual(len(await self.client.path("tiny", (0, 0), [(0, 1)])), 2)
+        stats = await self.client.stats()
+        self.assertEqual(stats["errors"], len(bad_requests))
+        self.assertEqual(stats["maps"], ["tiny"])
+
+    async def test_unload_map(self):
+        await self.client.load_map("tiny", walls=WALLS)
+        await self.client.path("tiny", (0, 0), [(2, 3)])
+        block = self.server.maps["tiny"].shared.info.name
+
+        self.assertEqual(await self.client.unload_map("tiny"), {"map": "tiny"})
+        self.assertEqual((await self.client.stats())["maps"], [])
+        with self.assertRaises(ValueError):
+            await self.client.path("tiny", (0, 0), [(2, 3)])
+
+        # Every worker let go of the shared block
+        for pid in self.server.executor._processes:
+            path = f"/proc/{pid}/maps"
+            if os.path.exists(path):
+                with open(path) as maps:
+                    self.assertNotIn(block.lstrip("/"), maps.read())
+
+        # The server adopted the block its build worker made, and freed it
+        if os.path.isdir("/dev/shm"):
+            self.assertFalse(os.path.exists(os.path.join("/dev/shm", block.lstrip("/"))))
+
+    async def test_stats_counters(self):
+        await self.client.load_map("tiny", walls=WALLS, landmarks=0)
+        for goal in [(0, 1), (2, 3), (0, 3)]:
+            await self.client.path("tiny", (0, 0), [goal])
+
+        stats = await self.client.stats()
+        self.assertEqual(stats["queries"], 3)
+        self.assertEqual(stats["batches"], 3)
+        self.assertEqual(stats["mean_batch"], 1.0)
+        self.assertEqual(stats["errors"], 0)
+        self.assertGreater(stats["queries_per_second"], 0)
+        self.assertLessEqual(stats["latency_ms"]["p50"], stats["latency_ms"]["max"])
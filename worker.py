@@ -0,0 +1,78 @@
+import queue
+import threading
+
+from algorithms import Pathfinder, SearchScratch
+
+
+class SearchWorker:
+    """
+    Runs one search at a time on a background thread.
+    Events are streamed back in batches through a queue, tagged with the
+    id of the search that produced them, so the UI can drop stale results.
+    """
+
+    def __init__(self, batch_size=256) -> None:
+        self.batch_size = batch_size
+        self.results = queue.SimpleQueue()
+        self.search_id = 0
+        self.scratch = None  # Reused by back-to-back searches
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self, grid_map, algorithm_name, **options):
+        """
+        Cancel any running search and start a new one on a GridMap snapshot
+        options go to the search, e.g. table_size for IDA* or max_nodes for SMA*
+        """
+        self.cancel()
+        # A cancelled search stops at its next event; wait for it so the
+        # two searches never share the scratch arrays
+        self.wait()
+        self._cancelled = threading.Event()
+
+        if self.scratch is None or self.scratch.size != len(grid_map.walls):
+            self.scratch = SearchScratch(len(grid_map.walls))
+
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self.search_id, grid_map, algorithm_name, options, self._cancelled),
+            daemon=True
+        )
+        self._thread.start()
+        return self.search_id
+
+    def cancel(self):
+        """Stop the current search; anything it already queued becomes stale"""
+        self._cancelled.set()
+        self.search_id += 1
+
+    def wait(self):
+        """Block until the search thread, if any, has stopped"""
+        if self._thread:
+            self._thread.join()
+
+    def poll(self):
+        """Drain queued events that belong to the current search"""
+        events = []
+        while True:
+            try:
+                search_id, batch = self.results.get_nowait()
+            except queue.Empty:
+                return events
+
+            if search_id == self.search_id:
+                events.extend(batch)
+
+    def _run(self, search_id, grid_map, algorithm_name, options, cancelled):
+        batch = []
+        events = Pathfinder.iter_search(grid_map, algorithm_name, self.scratch, **options)
+        for event in events:
+            if cancelled.is_set():
+                return
+
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                self.results.put((search_id, batch))
+                batch = []
+
+        self.results.put((search_id, batch))